@@ -0,0 +1,349 @@
+import argparse
+import contextlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# A job spec lists independent jobs, each run in its own process:
+#
+#   {"output_dir": "results",
+#    "jobs": [{"name": "movies", "dataset": "data/my_data.csv", "streaming": false, "cache": true,
+#              "incremental": false, "trace": false,
+#              "tests": [{"type": "normality", "column": "Rating"},
+#                        {"type": "hypothesis", "continuous": "Rating", "categorical": "is_high_revenue"},
+#                        {"type": "regression", "x": "Votes", "y": "Revenue (Millions)"},
+#                        {"type": "sentiment", "column": "Description", "engine": "vader"}]}]}
+#
+# Each job writes <name>.json (results), <name>.log (printed output), sentiment
+# tables as Parquet (CSV when no Parquet engine is installed) and figures as PNG.
+# "trace" (true, "cprofile" or "tracemalloc") also records per-method timings to
+# <name>.trace.jsonl and adds their summary to the results.
+
+
+def load_spec(path):
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ImportError("PyYAML is not installed. Please install it or use a JSON job spec.")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def to_builtin(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        return value.to_dict()
+    return str(value)
+
+
+# Batch tests whose results cannot be merged from appended rows (the keys of
+# incremental.NON_MERGEABLE); an incremental job records the ones it ran so a
+# later refresh lists them for recomputation.
+def _non_mergeable_kind(test, result):
+    if test.get('resamples'):
+        return 'resampling'
+    if test['type'] == 'inspect':
+        return 'central_tendency'
+    if test['type'] == 'normality':
+        return 'normality_sample'
+    if test['type'] == 't_test' and 'Mann' in str(result.get('test')):
+        return 'mann_whitney'
+    if test['type'] == 'screen':
+        return 'pair_screening'
+    return None
+
+
+def _slug(text):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', str(text)).strip('_')
+
+
+class BatchJob:
+    def __init__(self, job, output_dir):
+        self.job = job
+        self.name = _slug(job.get('name', os.path.splitext(os.path.basename(job['dataset']))[0]))
+        self.output_dir = output_dir
+        self.figure_count = 0
+        self.df = None
+        self.analyses = {}
+        self.incremental = None
+        self.incremental_tests = {}
+
+    def run(self):
+        import matplotlib
+        matplotlib.use('Agg')
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        trace = self.job.get('trace')
+        if trace:
+            import instrumentation
+            instrumentation.enable(os.path.join(self.output_dir, f"{self.name}.trace.jsonl"),
+                                   trace if isinstance(trace, str) else None)
+        results = []
+        with open(os.path.join(self.output_dir, f"{self.name}.log"), 'w') as log, contextlib.redirect_stdout(log):
+            self.df = self.load_dataset()
+            if self.job.get('incremental'):
+                new_rows = self.track_incremental()
+                print(f"Incremental update: {new_rows} rows processed")
+            for index, test in enumerate(self.job.get('tests', [])):
+                entry = {'type': test['type'], 'params': test}
+                try:
+                    entry['result'] = self.run_test(index, test)
+                    self.note_computed(index, test, entry['result'])
+                except Exception as e:
+                    entry['error'] = f"{type(e).__name__}: {e}"
+                    print(f"Test {index} ({test['type']}) failed: {e}")
+                results.append(entry)
+
+        output = {'name': self.name, 'dataset': self.job['dataset'], 'shape': list(self.df.shape), 'results': results}
+        if self.incremental is not None:
+            output['incremental'] = {'rows': self.incremental.rows, 'needs_recompute': self.incremental.stale}
+        if trace:
+            output['instrumentation'] = instrumentation.summary().to_dict(orient='index')
+            instrumentation.disable()
+        result_path = os.path.join(self.output_dir, f"{self.name}.json")
+        with open(result_path, 'w') as f:
+            json.dump(output, f, indent=2, default=to_builtin)
+        return result_path
+
+    def load_dataset(self):
+        from dataset_cache import load_dataset
+        return load_dataset(self.job['dataset'], self.job.get('streaming', False), self.job.get('cache', True))
+
+    # With "incremental": true, tests whose statistics are mergeable are answered
+    # from state kept next to the dataset and updated with appended rows only.
+    def track_incremental(self):
+        from incremental import IncrementalAnalysis
+        self.incremental = IncrementalAnalysis.open(self.job['dataset'])
+        for index, test in enumerate(self.job.get('tests', [])):
+            if test.get('resamples'):
+                continue
+            # A test that cannot be tracked runs on the loaded frame instead, where
+            # its error is reported like any other test's.
+            try:
+                if test['type'] == 'hypothesis':
+                    skewed = self.analysis('analysis1').check_skewness(self.df[test['continuous']])
+                    name = self.incremental.track_group_test(test['continuous'], test['categorical'], skewed, self.df)
+                elif test['type'] == 'chi_square':
+                    name = self.incremental.track_chi_square(*test['columns'], df=self.df)
+                elif test['type'] == 'regression':
+                    name = self.incremental.track_regression(test['x'], test['y'], self.df)
+                elif test['type'] == 'sentiment' and not test.get('options'):
+                    name = self.incremental.track_sentiment(test['column'], test.get('engine', 'vader'), self.df)
+                else:
+                    continue
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Test {index} ({test['type']}) not tracked incrementally: {e}")
+                continue
+            self.incremental_tests[index] = name
+        return self.incremental.refresh(self.analysis('sentiment').cache)
+
+    def note_computed(self, index, test, result):
+        if self.incremental is None or index in self.incremental_tests:
+            return
+        kind = _non_mergeable_kind(test, result)
+        if kind is not None:
+            params = '~'.join(f"{key}={test[key]}" for key in sorted(test) if key != 'type')
+            self.incremental.note_computed(f"{test['type']}:{params}", kind, test)
+
+    def incremental_result(self, index, test):
+        name = self.incremental_tests[index]
+        if test['type'] != 'sentiment':
+            result = self.incremental.results()[name]
+            if 'error' in result:
+                raise ValueError(result['error'])
+            return result
+        result_df = self.incremental.sentiment_frame(name)
+        result_df.insert(0, 'Text', self.df[test['column']].reindex(result_df.index))
+        return self.write_sentiment(result_df, test['column'], self.incremental.sentiment[name]['engine'])
+
+    def analysis(self, kind):
+        if kind not in self.analyses:
+            if kind == 'inspection':
+                from data_inspection import DataInspection
+                di = DataInspection()
+                di.df = self.df
+                self.analyses[kind] = di
+            elif kind == 'analysis1':
+                from data_analysis1 import DataAnalysis1
+                self.analyses[kind] = DataAnalysis1(self.df)
+            elif kind == 'analysis2':
+                from data_analysis2 import DataAnalysis2
+                self.analyses[kind] = DataAnalysis2(self.df)
+            else:
+                from sentiment_analysis import SentimentAnalysis
+                cache = None
+                if self.job.get('sentiment_cache'):
+                    from sentiment_cache import SentimentCache
+                    cache = SentimentCache(self.job['sentiment_cache'])
+                self.analyses[kind] = SentimentAnalysis(self.df, cache=cache)
+        return self.analyses[kind]
+
+    # Plotting methods call plt.show(), which does nothing under Agg, so every
+    # figure left open by a test is written out here and closed.
+    def save_figures(self, index, test_type):
+        import matplotlib.pyplot as plt
+        paths = []
+        for number in plt.get_fignums():
+            self.figure_count += 1
+            path = os.path.join(self.output_dir, f"{self.name}_{index:03d}_{test_type}_{self.figure_count}.png")
+            plt.figure(number).savefig(path)
+            paths.append(path)
+        plt.close('all')
+        return paths
+
+    def run_test(self, index, test):
+        test_type = test['type']
+        if index in self.incremental_tests:
+            return self.incremental_result(index, test)
+        result = self.dispatch(test_type, test)
+        figures = self.save_figures(index, test_type)
+        if figures:
+            result['figures'] = figures
+        return result
+
+    def dispatch(self, test_type, test):
+        if test_type == 'inspect':
+            di = self.analysis('inspection')
+            columns = [col for col in test.get('columns', list(di.df.columns)) if col in di.df.columns]
+            plot = test.get('plot', True)
+            return {'central_tendency': {col: di.classify_and_calculate(col, plot=plot) for col in columns}}
+        if test_type == 'scatter':
+            self.analysis('inspection').plot_scatter(test['x'], test['y'])
+            return {}
+        if test_type == 'boxplot':
+            self.analysis('inspection').plot_boxplot(test['ordinal'], test['numeric'])
+            return {}
+        if test_type == 'correlation':
+            df = self.analysis('inspection').df
+            return {'correlation': df[test['x']].corr(df[test['y']])}
+        if test_type in ('std', 'kurtosis', 'skewness'):
+            series = self.analysis('inspection').df[test['column']]
+            value = {'std': series.std, 'kurtosis': series.kurt, 'skewness': series.skew}[test_type]()
+            return {test_type: value}
+        if test_type == 'normality':
+            da1 = self.analysis('analysis1')
+            data = da1.df[test['column']]
+            if test.get('plot', True):
+                da1.plot_qq_histogram(data, test['column'])
+            stat, p_value = da1.check_normality(data)
+            return {'statistic': stat, 'p_value': p_value}
+        if test_type == 'hypothesis':
+            da1 = self.analysis('analysis1')
+            skewed = da1.check_skewness(da1.df[test['continuous']])
+            stat, p_value = da1.hypothesis_test(test['continuous'], test['categorical'], skewed,
+                                                test.get('null_hypothesis', ''), test.get('resamples', 0),
+                                                test.get('workers', 1))
+            result = {'test': 'Kruskal-Wallis Test' if skewed else 'ANOVA', 'statistic': stat, 'p_value': p_value}
+            return self.with_resampling(result, da1, test)
+        if test_type == 'regression':
+            da2 = self.analysis('analysis2')
+            result = da2.perform_regression(test['x'], test['y'], test.get('workers', 1), test.get('resamples', 0))
+            return self.with_resampling(result.as_dict(), da2, test)
+        if test_type == 't_test':
+            da2 = self.analysis('analysis2')
+            test_name, stat, p_value = da2.t_test_or_mannwhitney(test['continuous'], test['categorical'],
+                                                                 test.get('resamples', 0), test.get('workers', 1))
+            return self.with_resampling({'test': test_name, 'statistic': stat, 'p_value': p_value}, da2, test)
+        if test_type == 'chi_square':
+            chi2, p_value, dof = self.analysis('analysis2').chi_square_test(*test['columns'])
+            return {'chi2': chi2, 'p_value': p_value, 'dof': dof}
+        if test_type == 'chi_square_all_pairs':
+            table = self.analysis('analysis2').chi_square_all_pairs(test.get('columns'), test.get('workers', 1))
+            return {'pairs': table.to_dict(orient='records')}
+        if test_type == 'screen':
+            table = self.analysis('analysis2').screen_all_pairs(test.get('max_levels', 20), test.get('alpha', 0.05),
+                                                                test.get('workers', 1))
+            path = os.path.join(self.output_dir, f"{self.name}_screen.csv")
+            table.to_csv(path, index=False)
+            return {'table': path, 'tested': len(table), 'significant': int(table['Significant'].sum()),
+                    'top': table.head(test.get('top', 20)).to_dict(orient='records')}
+        if test_type == 'sentiment':
+            return self.sentiment(test)
+        raise ValueError(f"Unknown test type '{test_type}'.")
+
+    def with_resampling(self, result, analysis, test):
+        if test.get('resamples'):
+            resampling = dict(analysis.resampling_result)
+            if 'intervals' in resampling:
+                resampling['intervals'] = resampling['intervals'].to_dict(orient='index')
+            result['resampling'] = resampling
+        return result
+
+    def sentiment(self, test):
+        from sentiment_analysis import result_frame
+        from text_column import TextColumn, memory_report
+        sa = self.analysis('sentiment')
+        column = test['column']
+        engine = test.get('engine', 'vader')
+        texts = TextColumn.from_series(self.df[column])
+        memory = memory_report(self.df[column], texts)
+        result_df = result_frame(engine, texts, sa.analyze(engine, texts, **test.get('options', {})))
+        memory['result_bytes'] = int(result_df.memory_usage(deep=True).sum())
+        if sa.cache is not None:
+            sa.cache.report()
+        result = self.write_sentiment(result_df, column, engine)
+        result['memory'] = memory
+        return result
+
+    def write_sentiment(self, result_df, column, engine):
+        path = os.path.join(self.output_dir, f"{self.name}_{_slug(column)}_{engine}.parquet")
+        try:
+            result_df.to_parquet(path)
+        except ImportError:
+            path = path[:-len('.parquet')] + '.csv'
+            result_df.to_csv(path)
+        return {'rows': len(result_df), 'table': path,
+                'sentiment_counts': result_df['Sentiment'].value_counts().to_dict()}
+
+
+def _run_job(job, output_dir):
+    return BatchJob(job, output_dir).run()
+
+
+def run_spec(spec, workers=None):
+    output_dir = spec.get('output_dir', 'results')
+    jobs = spec.get('jobs', [])
+    if workers is None:
+        workers = min(len(jobs), os.cpu_count() or 1) or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_job, job, output_dir) for job in jobs]
+        paths = []
+        for job, future in zip(jobs, futures):
+            try:
+                paths.append(future.result())
+                print(f"Job '{job.get('name', job['dataset'])}' finished: {paths[-1]}")
+            except Exception as e:
+                print(f"Job '{job.get('name', job['dataset'])}' failed: {e}")
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run analysis jobs from a JSON/YAML job spec without prompts.")
+    parser.add_argument('spec', help="Path to the job spec (.json, .yaml or .yml).")
+    parser.add_argument('--workers', type=int, help="Number of jobs to run at once.")
+    args = parser.parse_args(argv)
+
+    try:
+        spec = load_spec(args.spec)
+    except Exception as e:
+        print(f"Error loading job spec: {e}")
+        sys.exit(1)
+    paths = run_spec(spec, args.workers)
+    if len(paths) < len(spec.get('jobs', [])):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from sentiment_analysis import SentimentAnalysis
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA = os.path.join(PACKAGE_DIR, 'data', 'my_data.csv')
+IMPORT_MODULES = ['main', 'dataset_cache', 'data_inspection', 'data_analysis1', 'data_analysis2',
+                  'sentiment_analysis', 'batch_runner']
+
+
+def replicate_column(file_path, column, rows):
+    base = pd.read_csv(file_path, usecols=[column])[column].dropna()
+    repeats = -(-rows // len(base))
+    return pd.concat([base] * repeats, ignore_index=True).iloc[:rows]
+
+
+# Synthetic table with the same mix of column kinds as data/my_data.csv:
+# interval numerics (some with gaps), low-cardinality ordinal numerics, binary and
+# multi-level nominal strings, and free-text columns sampled from the real descriptions.
+def make_dataset(rows, cols, seed=0, text_source=DEFAULT_DATA, text_rows=None):
+    rng = np.random.default_rng(seed)
+    n_text = max(1, cols // 10)
+    n_nominal = max(2, (cols * 3) // 10)
+    n_ordinal = max(1, cols // 10)
+    n_interval = max(2, cols - n_text - n_nominal - n_ordinal)
+
+    data = {}
+    for i in range(n_interval):
+        values = rng.lognormal(mean=3.0, sigma=0.5 + (i % 5) * 0.2, size=rows)
+        if i % 4 == 3:
+            values[rng.random(rows) < 0.1] = np.nan
+        data[f'interval_{i}'] = values
+    for i in range(n_ordinal):
+        data[f'ordinal_{i}'] = rng.integers(1, 6 + i % 5, size=rows).astype(np.int8)
+    for i in range(n_nominal):
+        levels = np.array(['High', 'Low']) if i % 3 == 0 else np.array([f'Group {j}' for j in range(3 + i % 4)])
+        data[f'nominal_{i}'] = pd.Categorical.from_codes(rng.integers(0, len(levels), size=rows), levels)
+
+    if text_rows is None:
+        text_rows = rows
+    text = replicate_column(text_source, 'Description', min(rows, text_rows))
+    for i in range(n_text):
+        column = np.full(rows, None, dtype=object)
+        column[:len(text)] = text.sample(frac=1.0, random_state=seed + i).to_numpy()
+        data[f'text_{i}'] = column
+    return pd.DataFrame(data)
+
+
+def measure(func, memory=True):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start_cpu = time.process_time()
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+        cpu_seconds = time.process_time() - start_cpu
+        result = {'seconds': seconds, 'cpu_seconds': cpu_seconds}
+        if memory:
+            tracemalloc.start()
+            func()
+            result['peak_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+    return result
+
+
+def entry_points(df, text_rows, engines):
+    from column_profile import invalidate_profile
+    from data_analysis1 import DataAnalysis1
+    from data_analysis2 import DataAnalysis2
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        da1 = DataAnalysis1(df)
+        da2 = DataAnalysis2(df)
+    sa = SentimentAnalysis(df)
+    interval = df['interval_0']
+    texts = df['text_0'].dropna().iloc[:text_rows]
+
+    def classify():
+        invalidate_profile(df)
+        da1.list_column_types()
+
+    points = {
+        'column_classification': classify,
+        'check_normality': lambda: da1.check_normality(interval),
+        'hypothesis_test': lambda: da1.hypothesis_test('interval_0', 'nominal_1', False, ''),
+        'hypothesis_test_kruskal': lambda: da1.hypothesis_test('interval_0', 'nominal_1', True, ''),
+        'perform_regression': lambda: da2.perform_regression('interval_0', 'interval_1'),
+        'chi_square_test': lambda: da2.chi_square_test('nominal_0', 'nominal_1'),
+        't_test_or_mannwhitney': lambda: da2.t_test_or_mannwhitney('interval_0', 'nominal_0'),
+    }
+    # The text columns repeat the 1,000 real descriptions, so analyze(), which
+    # scores each distinct text once, does far less work than the row count
+    # suggests. sentiment_<engine> times the engine on every row;
+    # sentiment_<engine>_analyze times the deduplicating path on the same rows.
+    for engine in engines:
+        points[f'sentiment_{engine}'] = lambda engine=engine: sa.engines[engine](texts)
+        points[f'sentiment_{engine}_analyze'] = lambda engine=engine: sa.analyze(engine, texts)
+    return points
+
+
+def run_suite(rows_list, cols_list, text_rows, engines, memory=True, seed=0):
+    results = []
+    for rows in rows_list:
+        for cols in cols_list:
+            df = make_dataset(rows, cols, seed=seed, text_rows=text_rows)
+            distinct_texts = df['text_0'].dropna().iloc[:text_rows].nunique()
+            for name, func in entry_points(df, text_rows, engines).items():
+                entry = {'entry_point': name, 'rows': rows, 'cols': cols}
+                if name.startswith('sentiment_'):
+                    entry['rows'] = min(rows, text_rows)
+                    entry['distinct_texts'] = int(distinct_texts)
+                try:
+                    entry.update(measure(func, memory))
+                except ImportError as e:
+                    entry['skipped'] = str(e)
+                except Exception as e:
+                    entry['error'] = f"{type(e).__name__}: {e}"
+                results.append(entry)
+                if 'seconds' in entry:
+                    timing = f"{entry['seconds']:.4f}s"
+                else:
+                    timing = entry.get('skipped') or entry['error']
+                if 'distinct_texts' in entry:
+                    timing += f" ({entry['distinct_texts']} distinct texts)"
+                print(f"{name} rows={entry['rows']} cols={cols}: {timing}")
+    return results
+
+
+# Each module is imported in a fresh interpreter under -X importtime, so the
+# numbers match what a new session pays; 'heaviest' lists the slowest direct
+# dependencies by cumulative time.
+def import_times(modules=IMPORT_MODULES, top=5):
+    results = []
+    for module in modules:
+        completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                   capture_output=True, text=True, cwd=PACKAGE_DIR)
+        entries = []
+        for line in completed.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            entries.append(((len(name) - len(name.lstrip()) - 1) // 2, name.strip(), int(cumulative) / 1e6))
+        # -X importtime lists dependencies before the module that imported them,
+        # so the module's subtree is the run of nested entries just above it.
+        position = next((i for i, (depth, name, _) in enumerate(entries) if depth == 0 and name == module), None)
+        total = None if position is None else entries[position][2]
+        children = []
+        for depth, name, seconds in reversed(entries[:position or 0]):
+            if depth == 0:
+                break
+            if depth == 1:
+                children.append((depth, name, seconds))
+        children.sort(key=lambda entry: -entry[2])
+        results.append({
+            'module': module,
+            'seconds': total,
+            'heaviest': [{'module': name, 'seconds': seconds} for _, name, seconds in children[:top]],
+            'error': completed.stderr.strip().splitlines()[-1] if completed.returncode else None,
+        })
+    return results
+
+
+def time_to_first_prompt(timeout=60):
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'main.py'], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, cwd=PACKAGE_DIR)
+    output = b''
+    try:
+        while b'Please provide' not in output and time.perf_counter() - start < timeout:
+            data = process.stdout.read1(4096)
+            if not data:
+                return None
+            output += data
+        return time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+
+
+def print_import_report(imports, first_prompt):
+    if first_prompt is not None:
+        print(f"Time to first prompt: {first_prompt * 1000:.0f} ms")
+    for entry in imports:
+        if entry['seconds'] is None:
+            print(f"import {entry['module']}: failed ({entry['error']})")
+            continue
+        heaviest = ', '.join(f"{dep['module']} {dep['seconds'] * 1000:.0f} ms" for dep in entry['heaviest'])
+        print(f"import {entry['module']}: {entry['seconds'] * 1000:.0f} ms ({heaviest})")
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(results, path, imports=None, first_prompt=None):
+    report = {
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'cpu_count': os.cpu_count(),
+        'results': results,
+        'time_to_first_prompt': first_prompt,
+        'imports': imports,
+    }
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+# Prints the time ratio (current / baseline) for every measurement present in
+# both reports; ratios above threshold are flagged as regressions.
+def compare_reports(baseline_path, current_path, threshold=1.2):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(current_path) as f:
+        current = json.load(f)
+    key = lambda entry: (entry['entry_point'], entry['rows'], entry['cols'])
+    before = {key(entry): entry for entry in baseline['results'] if 'seconds' in entry}
+    regressions = []
+    for entry in current['results']:
+        if 'seconds' not in entry or key(entry) not in before:
+            continue
+        old = before[key(entry)]['seconds']
+        ratio = entry['seconds'] / old if old > 0 else float('inf')
+        flag = ' REGRESSION' if ratio > threshold else ''
+        print(f"{entry['entry_point']} rows={entry['rows']} cols={entry['cols']}: {ratio:.2f}x{flag}")
+        if flag:
+            regressions.append(key(entry))
+    return regressions
+
+
+def benchmark_vader(file_path, column, sizes, worker_counts, chunk_size=10000):
+    results = []
+    for rows in sizes:
+        texts = replicate_column(file_path, column, rows)
+        sa = SentimentAnalysis(texts.to_frame())
+        for workers in worker_counts:
+            start = time.perf_counter()
+            sa.vader_sentiment_analysis(texts, workers=workers, chunk_size=chunk_size)
+            elapsed = time.perf_counter() - start
+            results.append({
+                'engine': 'vader',
+                'rows': rows,
+                'workers': workers,
+                'chunk_size': chunk_size,
+                'seconds': elapsed,
+                'rows_per_sec': rows / elapsed if elapsed > 0 else float('inf'),
+            })
+            print(f"VADER rows={rows} workers={workers}: {results[-1]['rows_per_sec']:.0f} rows/sec")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the analysis entry points.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    suite = commands.add_parser('suite', help="Time and memory-profile every analysis entry point.")
+    suite.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    suite.add_argument('--cols', type=int, nargs='+', default=[10, 100])
+    suite.add_argument('--text-rows', type=int, default=2000, help="Rows scored by the sentiment engines.")
+    suite.add_argument('--engines', nargs='+', default=['vader', 'textblob', 'distilbert'])
+    suite.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc run.")
+    suite.add_argument('--output', default='benchmark_results.json')
+    suite.add_argument('--compare', help="Baseline JSON report to compare the new results against.")
+    suite.add_argument('--no-imports', action='store_true', help="Skip the import-time report.")
+
+    commands.add_parser('imports', help="Import time of each module and time to the first prompt.")
+
+    vader = commands.add_parser('vader', help="VADER throughput versus worker count.")
+    vader.add_argument('--file', default=DEFAULT_DATA)
+    vader.add_argument('--column', default='Description')
+    vader.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    vader.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    vader.add_argument('--chunk-size', type=int, default=10000)
+    vader.add_argument('--output', help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    if args.command == 'suite':
+        imports = first_prompt = None
+        if not args.no_imports:
+            imports, first_prompt = import_times(), time_to_first_prompt()
+            print_import_report(imports, first_prompt)
+        results = run_suite(args.rows, args.cols, args.text_rows, args.engines, memory=not args.no_memory)
+        write_report(results, args.output, imports, first_prompt)
+        if args.compare:
+            compare_reports(args.compare, args.output)
+    elif args.command == 'imports':
+        print_import_report(import_times(), time_to_first_prompt())
+    else:
+        results = benchmark_vader(args.file, args.column, args.sizes, sorted(set(args.workers)), args.chunk_size)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import weakref
+import numpy as np
+import pandas as pd
+from running_stats import column_moments, sample_skew, sample_kurt
+
+_profile_cache = {}
+
+
+class ColumnProfile:
+    def __init__(self, stats):
+        self.stats = stats
+
+    def nunique(self, col):
+        return int(self.stats.at[col, 'nunique'])
+
+    def is_numeric(self, col):
+        return bool(self.stats.at[col, 'numeric'])
+
+    def classify(self, limit, inclusive=False, count_missing=False,
+                 numeric_labels=('numeric ordinal', 'interval'),
+                 text_labels=('non-numeric ordinal', 'nominal')):
+        uniques = self.stats['nunique'].to_numpy()
+        if count_missing:
+            uniques = uniques + (self.stats['missing'].to_numpy() > 0)
+        low = uniques <= limit if inclusive else uniques < limit
+        numeric = self.stats['numeric'].to_numpy(dtype=bool)
+        labels = np.where(numeric,
+                          np.where(low, numeric_labels[0], numeric_labels[1]),
+                          np.where(low, text_labels[0], text_labels[1]))
+        return dict(zip(self.stats.index, labels.tolist()))
+
+
+def profile_columns(df, block_size=256):
+    key = id(df)
+    fingerprint = _fingerprint(df)
+    cached = _profile_cache.get(key)
+    if cached is not None and cached[0]() is df and cached[1] == fingerprint:
+        return cached[2]
+
+    profile = ColumnProfile(compute_stats(df, block_size))
+    _profile_cache[key] = (weakref.ref(df, lambda ref: _profile_cache.pop(key, None)), fingerprint, profile)
+    return profile
+
+
+def seed_profile(df, stats):
+    # Registers previously computed statistics (e.g. from the dataset cache) for df.
+    key = id(df)
+    profile = ColumnProfile(stats)
+    _profile_cache[key] = (weakref.ref(df, lambda ref: _profile_cache.pop(key, None)), _fingerprint(df), profile)
+    return profile
+
+
+def invalidate_profile(df):
+    _profile_cache.pop(id(df), None)
+
+
+def _fingerprint(df):
+    return df.shape, tuple(df.columns), tuple(str(dtype) for dtype in df.dtypes)
+
+
+def compute_stats(df, block_size=256):
+    columns = list(df.columns)
+    numeric = np.array([pd.api.types.is_numeric_dtype(df[col]) for col in columns], dtype=bool)
+    stats = pd.DataFrame(index=pd.Index(columns), data={
+        'dtype': [str(dtype) for dtype in df.dtypes],
+        'numeric': numeric,
+        'count': np.zeros(len(columns), dtype=np.int64),
+        'missing': df.isna().sum().to_numpy(),
+        'nunique': df.nunique().to_numpy(),
+        'min': np.nan,
+        'max': np.nan,
+        'mean': np.nan,
+        'std': np.nan,
+        'skew': np.nan,
+        'kurt': np.nan,
+    })
+    stats['count'] = len(df) - stats['missing']
+
+    # Numeric columns are converted and reduced a block at a time so very wide
+    # frames never need a full float64 copy.
+    numeric_cols = [col for col, flag in zip(columns, numeric) if flag]
+    for start in range(0, len(numeric_cols), block_size):
+        block = numeric_cols[start:start + block_size]
+        values = df[block].to_numpy(dtype=np.float64, na_value=np.nan)
+        n, mean, m2, m3, m4 = column_moments(values)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stats.loc[block, 'mean'] = mean
+            stats.loc[block, 'std'] = np.where(n > 1, np.sqrt(m2 / (n - 1)), np.nan)
+        stats.loc[block, 'skew'] = sample_skew(n, m2, m3)
+        stats.loc[block, 'kurt'] = sample_kurt(n, m2, m4)
+        if len(values):
+            stats.loc[block, 'min'] = np.where(n > 0, np.where(np.isnan(values), np.inf, values).min(axis=0), np.nan)
+            stats.loc[block, 'max'] = np.where(n > 0, np.where(np.isnan(values), -np.inf, values).max(axis=0), np.nan)
+    return stats
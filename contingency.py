@@ -0,0 +1,135 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+import numpy as np
+import pandas as pd
+from scipy import sparse, stats
+
+
+def encode(series, labels=None):
+    # Integer codes for a column, optionally extending an existing label index;
+    # missing values get code -1.
+    values = pd.Series(series)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    if labels is None:
+        codes, labels = pd.factorize(values, sort=False)
+        return codes, pd.Index(labels)
+    new = pd.Index(values.dropna().unique()).difference(labels, sort=False)
+    labels = labels.append(new) if len(new) else labels
+    return labels.get_indexer(values), labels
+
+
+class ContingencyCounts:
+    # Sparse contingency table: category labels are encoded to integer codes and
+    # only non-zero pair counts are stored. Tables built from separate chunks or
+    # workers merge by remapping codes onto the union of labels.
+    def __init__(self):
+        self.row_labels = pd.Index([])
+        self.col_labels = pd.Index([])
+        self.counts = sparse.csr_matrix((0, 0), dtype=np.int64)
+
+    @classmethod
+    def from_columns(cls, rows, cols):
+        table = cls()
+        table.update(rows, cols)
+        return table
+
+    @classmethod
+    def from_codes(cls, row_codes, col_codes, row_labels, col_labels):
+        table = cls()
+        table.row_labels, table.col_labels = row_labels, col_labels
+        table.counts = _pair_counts(row_codes, col_codes, len(row_labels), len(col_labels))
+        return table
+
+    def update(self, rows, cols):
+        row_codes, self.row_labels = encode(rows, self.row_labels if len(self.row_labels) else None)
+        col_codes, self.col_labels = encode(cols, self.col_labels if len(self.col_labels) else None)
+        chunk = _pair_counts(row_codes, col_codes, len(self.row_labels), len(self.col_labels))
+        self.counts = _resize(self.counts, chunk.shape) + chunk
+        return self
+
+    def merge(self, other):
+        row_labels = self.row_labels.append(other.row_labels.difference(self.row_labels, sort=False))
+        col_labels = self.col_labels.append(other.col_labels.difference(self.col_labels, sort=False))
+        other_counts = other.counts.tocoo()
+        remapped = sparse.csr_matrix(
+            (other_counts.data,
+             (row_labels.get_indexer(other.row_labels)[other_counts.row],
+              col_labels.get_indexer(other.col_labels)[other_counts.col])),
+            shape=(len(row_labels), len(col_labels)), dtype=np.int64)
+        self.counts = _resize(self.counts, remapped.shape) + remapped
+        self.row_labels, self.col_labels = row_labels, col_labels
+        return self
+
+    def marginals(self):
+        rows = np.asarray(self.counts.sum(axis=1)).ravel()
+        cols = np.asarray(self.counts.sum(axis=0)).ravel()
+        return rows, cols
+
+    # Expected counts are the outer product of these two vectors, so they are
+    # never materialised as a dense table: expected[i, j] == rows[i] * cols[j].
+    def expected_factors(self):
+        rows, cols = self.marginals()
+        return rows, cols / max(rows.sum(), 1)
+
+    def chi2(self, correction=True):
+        rows, cols = self.marginals()
+        keep_rows, keep_cols = rows > 0, cols > 0
+        counts = self.counts[keep_rows][:, keep_cols].tocoo()
+        rows, cols = rows[keep_rows], cols[keep_cols]
+        total = rows.sum()
+        dof = (len(rows) - 1) * (len(cols) - 1)
+        if dof == 0:
+            return 0.0, 1.0, dof
+        if dof == 1 and correction:
+            # 2x2 tables are tiny; defer to scipy for the Yates correction.
+            chi2, p, dof, _ = stats.chi2_contingency(counts.toarray(), correction=True)
+            return chi2, p, dof
+        # sum((O - E)^2 / E) == sum(O^2 / E) - N, and O^2 / E is zero wherever O is.
+        expected = rows[counts.row] * cols[counts.col] / total
+        chi2 = np.sum(counts.data.astype(np.float64) ** 2 / expected) - total
+        return chi2, stats.chi2.sf(chi2, dof), dof
+
+    def to_frame(self):
+        return pd.DataFrame(self.counts.toarray(), index=self.row_labels, columns=self.col_labels)
+
+
+def _pair_counts(row_codes, col_codes, n_rows, n_cols):
+    valid = (row_codes >= 0) & (col_codes >= 0)
+    return sparse.csr_matrix((np.ones(valid.sum(), dtype=np.int64), (row_codes[valid], col_codes[valid])),
+                             shape=(n_rows, n_cols), dtype=np.int64)
+
+
+def _resize(matrix, shape):
+    matrix = matrix.tocsr(copy=True)
+    matrix.resize(shape)
+    return matrix
+
+
+_shared_codes = None
+
+
+def _init_codes(codes):
+    global _shared_codes
+    _shared_codes = codes
+
+
+def _test_pair(pair):
+    (codes_a, labels_a), (codes_b, labels_b) = _shared_codes[pair[0]], _shared_codes[pair[1]]
+    chi2, p, dof = ContingencyCounts.from_codes(codes_a, codes_b, labels_a, labels_b).chi2()
+    return pair[0], pair[1], chi2, p, dof
+
+
+def chi_square_all_pairs(df, columns, workers=1):
+    # Each column is encoded once and the codes are shipped to every worker once
+    # through the pool initializer; tasks then only name the pair to test.
+    codes = {col: encode(df[col]) for col in columns}
+    pairs = list(combinations(columns, 2))
+    if workers <= 1:
+        _init_codes(codes)
+        results = [_test_pair(pair) for pair in pairs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_codes, initargs=(codes,)) as executor:
+            results = list(executor.map(_test_pair, pairs, chunksize=max(1, len(pairs) // (workers * 4))))
+    table = pd.DataFrame(results, columns=['Variable 1', 'Variable 2', 'Chi2', 'P-value', 'DoF'])
+    return table.sort_values('P-value', ignore_index=True)
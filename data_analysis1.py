@@ -1,24 +1,22 @@
 import pandas as pd
 import numpy as np
 from scipy import stats
-import statsmodels.api as sm
-import matplotlib.pyplot as plt
-import seaborn as sns
+from column_profile import profile_columns
+from normality import NormalitySketch, moment_normality_tests, normality_test
+from running_stats import GroupMoments, GroupRankSums
+from screening import screen_pairs
+from resampling import anova_test
+from instrumentation import instrument_class
 
+@instrument_class(exclude=('select_variable',))
 class DataAnalysis1:
     def __init__(self, df):
         self.df = df
+        self.resampling_result = None
         self.column_types = self.list_column_types()
 
     def list_column_types(self):
-        column_types = {}
-        for column in self.df.columns:
-            if pd.api.types.is_numeric_dtype(self.df[column]):
-                unique_values = self.df[column].nunique()
-                column_types[column] = 'numeric ordinal' if unique_values < 20 else 'interval'
-            else:
-                column_types[column] = 'non-numeric ordinal' if self.df[column].nunique() < 20 else 'nominal'
-        return column_types
+        return profile_columns(self.df).classify(20)
 
     def select_variable(self, data_type, allow_skip=False):
         available_vars = [col for col, col_type in self.column_types.items() if col_type == data_type]
@@ -31,7 +29,13 @@ class DataAnalysis1:
                 return selected_var
             print("Invalid choice. Please try again.")
 
-    def plot_qq_histogram(self, data, title):
+    def plot_qq_histogram(self, data, title, sketch_limit=5000):
+        if len(data) > sketch_limit:
+            return self.plot_qq_histogram_sketch(NormalitySketch.from_values(data), title)
+        # Plotting libraries are imported on first use to keep startup fast.
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        import statsmodels.api as sm
         fig, axes = plt.subplots(1, 2, figsize=(12, 6))
         sm.qqplot(data, line='s', ax=axes[0])
         axes[0].set_title(f"Q-Q Plot of {title}")
@@ -40,32 +44,84 @@ class DataAnalysis1:
         plt.tight_layout()
         plt.show()
 
-    def check_normality(self, data, size_limit=2000):
-        data = data.dropna()
-        if len(data) <= size_limit:
-            stat, p_value = stats.shapiro(data)
-            test_name = "Shapiro-Wilk Test"
-        else:
-            stat, p_value = stats.anderson(data, dist='norm')[:2]
-            test_name = "Anderson-Darling Test"
+    # Large columns are drawn from a NormalitySketch: the Q-Q points come from
+    # sketch quantiles and the histogram from its binned counts.
+    def plot_qq_histogram_sketch(self, sketch, title):
+        import matplotlib.pyplot as plt
+        fig, axes = plt.subplots(1, 2, figsize=(12, 6))
+        theoretical, sample = sketch.qq_points()
+        axes[0].plot(theoretical, sample, marker='o', linestyle='none')
+        axes[0].plot(theoretical, sketch.moments.mean + sketch.moments.std() * theoretical, 'r-')
+        axes[0].set_xlabel("Theoretical Quantiles")
+        axes[0].set_ylabel("Sample Quantiles")
+        axes[0].set_title(f"Q-Q Plot of {title}")
+        counts, edges = sketch.histogram.coarse()
+        axes[1].bar(edges[:-1], counts, width=np.diff(edges), align='edge')
+        axes[1].set_title(f"Histogram of {title}")
+        plt.tight_layout()
+        plt.show()
+
+    def check_normality(self, data, size_limit=2000, scalable=True):
+        test_name, stat, p_value, moment_tests = normality_test(data, size_limit, scalable)
         print(f"{test_name}: Statistic={stat}, p-value={p_value}")
+        for name, (moment_stat, moment_p) in moment_tests.items():
+            print(f"{name} Test (from moments): Statistic={moment_stat}, p-value={moment_p}")
         return stat, p_value
 
+    def check_normality_from_csv(self, file_path, column, size_limit=2000, chunksize=100000):
+        chunks = lambda: (chunk[column] for chunk in pd.read_csv(file_path, usecols=[column], chunksize=chunksize))
+        sketch = NormalitySketch.from_chunks(chunks, sample_size=size_limit)
+        stat, p_value = sketch.shapiro()
+        print(f"Shapiro-Wilk Test (stratified sample of {size_limit}): Statistic={stat}, p-value={p_value}")
+        for name, (moment_stat, moment_p) in moment_normality_tests(sketch.moments).items():
+            print(f"{name} Test (from moments): Statistic={moment_stat}, p-value={moment_p}")
+        return stat, p_value, sketch
+
     def check_skewness(self, data):
         skewness = stats.skew(data.dropna())
         print(f"Skewness: {skewness}")
         return abs(skewness) > 1
 
-    def hypothesis_test(self, continuous_var, categorical_var, skewed, null_hyp):
-        data = self.df[[continuous_var, categorical_var]].dropna()
-        groups = [group[continuous_var].values for name, group in data.groupby(categorical_var)]
+    def hypothesis_test(self, continuous_var, categorical_var, skewed, null_hyp, resamples=0, workers=1):
+        values = self.df[continuous_var]
+        groups = self.df[categorical_var]
+        if skewed:
+            accumulator = GroupRankSums.from_values(values, groups)
+        else:
+            accumulator = GroupMoments.from_values(values, groups)
+        result = self._report_group_test(accumulator, skewed)
+        if resamples:
+            self.resampling_result = anova_test(values, groups, resamples, workers=workers, ranks=skewed)
+            self._report_resampling(self.resampling_result)
+        return result
+
+    # Same test on a CSV that is never loaded whole: chunk-level accumulators are
+    # merged, so memory grows with the number of groups (and, for Kruskal-Wallis,
+    # distinct values) rather than with rows.
+    def hypothesis_test_from_csv(self, file_path, continuous_var, categorical_var, skewed, chunksize=100000):
+        accumulator = GroupRankSums() if skewed else GroupMoments()
+        for chunk in pd.read_csv(file_path, usecols=[continuous_var, categorical_var], chunksize=chunksize):
+            accumulator.update(chunk[continuous_var], chunk[categorical_var])
+        return self._report_group_test(accumulator, skewed)
 
+    def _report_group_test(self, accumulator, skewed):
         if skewed:
-            stat, p_value = stats.kruskal(*groups)
+            stat, p_value = accumulator.kruskal()
             test_name = "Kruskal-Wallis Test"
         else:
-            stat, p_value = stats.f_oneway(*groups)
+            stat, p_value = accumulator.anova()
             test_name = "ANOVA"
 
         print(f"{test_name}: Statistic={stat}, p-value={p_value}")
         return stat, p_value
+
+    def _report_resampling(self, result, confidence=0.95):
+        low, high = result['ci']
+        print(f"Permutation p-value: {result['permutation_p']}")
+        print(f"{result['effect_name']}: {result['effect']}, {confidence:.0%} bootstrap CI: ({low}, {high})")
+
+    def screen_all_pairs(self, max_levels=20, alpha=0.05, workers=1):
+        results = screen_pairs(self.df, self.column_types, max_levels, alpha, workers)
+        print(f"{int(results['Significant'].sum())} of {len(results)} pairs significant at FDR {alpha}:")
+        print(results)
+        return results
@@ -1,26 +1,24 @@
 import pandas as pd
 import numpy as np
 from scipy import stats
-import matplotlib.pyplot as plt
-
+from column_profile import profile_columns
+from normality import normality_test
+from regression import fit_frame, fit_csv
+from contingency import ContingencyCounts, chi_square_all_pairs
+from screening import screen_pairs
+from resampling import regression_test, two_group_test
+from instrumentation import instrument_class
+
+@instrument_class(exclude=('select_variable',))
 class DataAnalysis2:
     def __init__(self, df):
         self.df = df
+        self.resampling_result = None
         self.column_types = self.list_column_types()
 
     def list_column_types(self):
-        column_types = {}
-        for column in self.df.columns:
-            if pd.api.types.is_numeric_dtype(self.df[column]):
-                if len(self.df[column].unique()) <= 10:
-                    column_types[column] = 'numeric ordinal'
-                else:
-                    column_types[column] = 'interval'
-            else:
-                if len(self.df[column].unique()) <= 10:
-                    column_types[column] = 'nominal'
-                else:
-                    column_types[column] = 'non-numeric ordinal'
+        column_types = profile_columns(self.df).classify(10, inclusive=True, count_missing=True,
+                                                         text_labels=('nominal', 'non-numeric ordinal'))
         print("Column Classifications:")
         for col, dtype in column_types.items():
             print(f"{col}: {dtype}")
@@ -29,7 +27,8 @@ class DataAnalysis2:
     def select_variable(self, data_type, max_categories=None, allow_skip=False):
         available_columns = [col for col, dtype in self.column_types.items() if dtype == data_type]
         if max_categories is not None:
-            available_columns = [col for col in available_columns if self.df[col].nunique() <= max_categories]
+            profile = profile_columns(self.df)
+            available_columns = [col for col in available_columns if profile.nunique(col) <= max_categories]
 
         if not available_columns:
             if allow_skip:
@@ -44,34 +43,45 @@ class DataAnalysis2:
 
         return selected_column
 
-    def check_normality(self, data, size_limit=2000):
-        data = data.dropna()
-        if len(data) > size_limit:
-            stat, p_value = stats.anderson(data, dist='norm')[:2]
-            test_name = "Anderson-Darling Test"
-        else:
-            stat, p_value = stats.shapiro(data)
-            test_name = "Shapiro-Wilk Test"
+    def check_normality(self, data, size_limit=2000, scalable=True):
+        test_name, stat, p_value, moment_tests = normality_test(data, size_limit, scalable)
         print(f"{test_name}: Statistic={stat}, p-value={p_value}")
+        for name, (moment_stat, moment_p) in moment_tests.items():
+            print(f"{name} Test (from moments): Statistic={moment_stat}, p-value={moment_p}")
         return stat, p_value
 
-    def perform_regression(self, x_var, y_var):
-        X = self.df[x_var].dropna()
-        Y = self.df[y_var].dropna()
-
-        min_length = min(len(X), len(Y))
-        X = X[:min_length]
-        Y = Y[:min_length]
-
-        slope, intercept, r_value, p_value, std_err = stats.linregress(X, Y)
-
-        print(f"Slope: {slope:.4f}")
-        print(f"Intercept: {intercept:.4f}")
-        print(f"R-squared: {r_value ** 2:.4f}")
-        print(f"P-value: {p_value:.15f}")
-        print(f"Standard error: {std_err:.4f}")
+    def perform_regression(self, x_var, y_var, workers=1, resamples=0):
+        x_vars = [x_var] if isinstance(x_var, str) else list(x_var)
+        result = self._report_regression(fit_frame(self.df, x_vars, y_var, workers=workers))
+        if resamples:
+            self.resampling_result = regression_test(self.df, x_vars, y_var, resamples, workers=workers)
+            print(f"Permutation p-value (R-squared): {self.resampling_result['permutation_p']}")
+            print("95% bootstrap confidence intervals:")
+            print(self.resampling_result['intervals'])
+            if self.resampling_result['singular_resamples']:
+                print(f"{self.resampling_result['singular_resamples']} bootstrap resamples could not be fitted "
+                      f"and were left out.")
+        return result
+
+    def perform_regression_from_csv(self, file_path, x_var, y_var, chunksize=100000):
+        x_vars = [x_var] if isinstance(x_var, str) else list(x_var)
+        return self._report_regression(fit_csv(file_path, x_vars, y_var, chunksize))
+
+    def _report_regression(self, result):
+        if len(result.coefficients) == 2:
+            print(f"Slope: {result.coefficients.iloc[1]:.4f}")
+        print(f"Intercept: {result.intercept:.4f}")
+        print(f"R-squared: {result.r_squared:.4f}")
+        if len(result.coefficients) == 2:
+            print(f"P-value: {result.p_values.iloc[1]:.15f}")
+            print(f"Standard error: {result.std_errors.iloc[1]:.4f}")
+        else:
+            print(f"Adjusted R-squared: {result.adj_r_squared:.4f}")
+            print(f"F-statistic: {result.f_stat:.4f}, P-value: {result.f_p_value:.15f}")
+        print(result.summary())
+        return result
 
-    def t_test_or_mannwhitney(self, continuous_var, categorical_var):
+    def t_test_or_mannwhitney(self, continuous_var, categorical_var, resamples=0, workers=1):
         groups = [group[continuous_var].dropna() for name, group in self.df.groupby(categorical_var)]
         normality_test = self.check_normality(self.df[continuous_var])
 
@@ -83,9 +93,39 @@ class DataAnalysis2:
             test_name = "Mann-Whitney U Test"
 
         print(f"{test_name}: Statistic = {stat:.4f}, p-value = {p_value:.15f}")
+        if resamples:
+            result = two_group_test(*groups, n_resamples=resamples, workers=workers, ranks=test_name != "t-test")
+            low, high = result['ci']
+            print(f"Permutation p-value: {result['permutation_p']:.6f}")
+            print(f"{result['effect_name']}: {result['effect']:.4f}, 95% bootstrap CI: ({low:.4f}, {high:.4f})")
+            self.resampling_result = result
+        return test_name, stat, p_value
 
     def chi_square_test(self, categorical_var_1, categorical_var_2):
-        contingency_table = pd.crosstab(self.df[categorical_var_1], self.df[categorical_var_2])
-        chi2, p, dof, expected = stats.chi2_contingency(contingency_table)
+        contingency_table = ContingencyCounts.from_columns(self.df[categorical_var_1], self.df[categorical_var_2])
+        return self._report_chi_square(contingency_table)
+
+    def chi_square_test_from_csv(self, file_path, categorical_var_1, categorical_var_2, chunksize=100000):
+        contingency_table = ContingencyCounts()
+        for chunk in pd.read_csv(file_path, usecols=[categorical_var_1, categorical_var_2], chunksize=chunksize):
+            contingency_table.update(chunk[categorical_var_1], chunk[categorical_var_2])
+        return self._report_chi_square(contingency_table)
+
+    def _report_chi_square(self, contingency_table):
+        chi2, p, dof = contingency_table.chi2()
 
         print(f"Chi-square Test: chi2 = {chi2:.4f}, p-value = {p:.15f}")
+        return chi2, p, dof
+
+    def chi_square_all_pairs(self, columns=None, workers=1):
+        if columns is None:
+            columns = [col for col, dtype in self.column_types.items() if dtype == 'nominal']
+        results = chi_square_all_pairs(self.df, columns, workers)
+        print(results)
+        return results
+
+    def screen_all_pairs(self, max_levels=20, alpha=0.05, workers=1):
+        results = screen_pairs(self.df, self.column_types, max_levels, alpha, workers)
+        print(f"{int(results['Significant'].sum())} of {len(results)} pairs significant at FDR {alpha}:")
+        print(results)
+        return results
@@ -1,46 +1,202 @@
+import functools
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from column_profile import profile_columns
+from frame_view import FrameView
+from instrumentation import instrument_class
+from running_stats import pairwise_correlation, rank_columns
 
+# The helpers below reduce a column to a fixed-size summary with NumPy before
+# anything is drawn, so plot rendering time does not grow with the row count.
+def histogram_data(series, bins=10):
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.zeros(bins), np.linspace(0, 1, bins + 1)
+    return np.histogram(values, bins=bins)
+
+
+def boxplot_data(x, y, max_fliers=100):
+    data = pd.DataFrame({'x': x, 'y': y}).dropna()
+    grouped = data.groupby('x', observed=True)['y']
+    quartiles = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    iqr = quartiles[0.75] - quartiles[0.25]
+    low = data['x'].map(quartiles[0.25] - 1.5 * iqr)
+    high = data['x'].map(quartiles[0.75] + 1.5 * iqr)
+    inside = (data['y'] >= low) & (data['y'] <= high)
+    whislo = data['y'][inside].groupby(data['x'][inside], observed=True).min()
+    whishi = data['y'][inside].groupby(data['x'][inside], observed=True).max()
+    fliers = data[~inside].groupby('x', observed=True)['y']
+    stats = []
+    for key in quartiles.index:
+        group_fliers = fliers.get_group(key).to_numpy()[:max_fliers] if key in fliers.groups else np.empty(0)
+        stats.append({
+            'label': str(key),
+            'q1': quartiles.at[key, 0.25],
+            'med': quartiles.at[key, 0.5],
+            'q3': quartiles.at[key, 0.75],
+            'whislo': whislo.get(key, quartiles.at[key, 0.25]),
+            'whishi': whishi.get(key, quartiles.at[key, 0.75]),
+            'fliers': group_fliers,
+        })
+    return stats
+
+
+def bar_data(series, max_bars=50):
+    return series.value_counts().head(max_bars)
+
+
+def scatter_data(x, y, max_points=10000, seed=0):
+    if len(x) <= max_points:
+        return x, y
+    rows = np.sort(np.random.default_rng(seed).choice(len(x), size=max_points, replace=False))
+    return x.iloc[rows], y.iloc[rows]
+
+
+def _render_plot(frame, kind, args, path):
+    import matplotlib.pyplot as plt
+    plt.switch_backend('Agg')
+    di = DataInspection()
+    di.df = frame
+    fig = getattr(di, kind)(*args, show=False)
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+
+@instrument_class()
 class DataInspection:
     def __init__(self):
-        self.df = None
+        self._df = None
+        self.version = 0
+        self._stats_cache = {}
+        self.plot_plans = {}
+        self.render_futures = {}
+        self.fills = {}
+        self.classification = None
+
+    # Frames are wrapped in a FrameView, so imputation and type conversion never
+    # copy or modify the DataFrame that was assigned. A new frame drops everything
+    # derived from the old one; version is bumped rather than reset because the
+    # new view may reuse the old one's id() in cache keys.
+    @property
+    def df(self):
+        return self._df
+
+    @df.setter
+    def df(self, df):
+        if df is not None and not isinstance(df, FrameView):
+            df = FrameView(df)
+        self._df = df
+        self.version += 1
+        self._stats_cache = {}
+        self.plot_plans = {}
+        self.fills = {}
+        self.classification = None
 
     def load_csv(self, file_path):
         self.df = pd.read_csv(file_path)
         print(f"Data loaded successfully with {self.df.shape[0]} rows and {self.df.shape[1]} columns.")
 
-    def plot_histogram(self, col):
-        plt.figure()
-        self.df[col].hist(bins=10)
+    def plot_histogram(self, col, show=True):
+        import matplotlib.pyplot as plt
+        counts, edges = histogram_data(self.df[col])
+        fig = plt.figure()
+        plt.bar(edges[:-1], counts, width=np.diff(edges), align='edge')
+        plt.grid(True)
         plt.title(f'Histogram of {col}')
         plt.xlabel(col)
         plt.ylabel('Frequency')
-        plt.show()
+        return self._finish(fig, show)
 
-    def plot_boxplot(self, x_col, y_col):
-        plt.figure()
-        self.df.boxplot(column=y_col, by=x_col)
+    def plot_boxplot(self, x_col, y_col, show=True):
+        import matplotlib.pyplot as plt
+        stats = boxplot_data(self.df[x_col], self.df[y_col])
+        fig = plt.figure()
+        plt.gca().bxp(stats)
         plt.title(f'Box Plot of {y_col} by {x_col}')
         plt.xlabel(x_col)
         plt.ylabel(y_col)
         plt.suptitle('')
-        plt.show()
+        return self._finish(fig, show)
 
-    def plot_bar_chart(self, col):
-        plt.figure()
-        self.df[col].value_counts().plot(kind='bar')
+    def plot_bar_chart(self, col, show=True):
+        import matplotlib.pyplot as plt
+        fig = plt.figure()
+        bar_data(self.df[col]).plot(kind='bar')
         plt.title(f'Bar Chart of {col}')
         plt.xlabel(col)
         plt.ylabel('Frequency')
-        plt.show()
+        return self._finish(fig, show)
 
-    def plot_scatter(self, x_col, y_col):
-        plt.figure()
-        plt.scatter(self.df[x_col], self.df[y_col])
+    def plot_scatter(self, x_col, y_col, show=True):
+        import matplotlib.pyplot as plt
+        x, y = scatter_data(self.df[x_col], self.df[y_col])
+        fig = plt.figure()
+        plt.scatter(x, y)
         plt.title(f'Scatter Plot of {y_col} vs {x_col}')
         plt.xlabel(x_col)
         plt.ylabel(y_col)
-        plt.show()
+        return self._finish(fig, show)
+
+    def _finish(self, fig, show):
+        if show:
+            import matplotlib.pyplot as plt
+            plt.show()
+        return fig
+
+    def plot_column(self, col, show=True):
+        kind, args = self.plot_plans[col]
+        return getattr(self, kind)(*args, show=show)
+
+    # Renders every planned column plot to figure_dir with the Agg backend in a
+    # process pool. Returns the futures without waiting so the menu stays usable;
+    # they are also kept in render_futures, and each failure and the end of the
+    # run are printed as the plots finish.
+    def render_all_plots(self, figure_dir, workers=None):
+        os.makedirs(figure_dir, exist_ok=True)
+        executor = ProcessPoolExecutor(max_workers=workers)
+        futures = {}
+        progress = {'left': len(self.plot_plans), 'failed': 0}
+        lock = threading.Lock()
+
+        def finished(col, future):
+            error = future.exception() if not future.cancelled() else 'cancelled'
+            with lock:
+                progress['left'] -= 1
+                progress['failed'] += error is not None
+                left, failed = progress['left'], progress['failed']
+            if error is not None:
+                print(f"\nPlot for '{col}' failed: {error}")
+            if left == 0:
+                print(f"\nRendered {len(futures) - failed} of {len(futures)} plots to '{figure_dir}'"
+                      + (f" ({failed} failed)." if failed else "."))
+
+        for col, (kind, args) in self.plot_plans.items():
+            path = os.path.join(figure_dir, f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', str(col))}.png")
+            frame = self.df[list(dict.fromkeys(args))]
+            futures[col] = executor.submit(_render_plot, frame, kind, args, path)
+        for col, future in futures.items():
+            future.add_done_callback(functools.partial(finished, col))
+        executor.shutdown(wait=False)
+        self.render_futures = futures
+        return futures
+
+    # Counts of the last render_all_plots run by state, with each failure's error.
+    def render_status(self):
+        status = {'running': 0, 'done': 0, 'failed': {}}
+        for col, future in self.render_futures.items():
+            if not future.done():
+                status['running'] += 1
+            elif future.cancelled() or future.exception() is not None:
+                status['failed'][col] = 'cancelled' if future.cancelled() else repr(future.exception())
+            else:
+                status['done'] += 1
+        return status
 
     def handle_missing_values(self, col):
         total_missing = self.df[col].isnull().sum()
@@ -48,61 +204,131 @@ class DataInspection:
         missing_percentage = (total_missing / total) * 100
 
         if missing_percentage > 50:
-            self.df.drop(columns=[col], inplace=True)
-            print(f"Column '{col}' dropped due to more than 50% missing values.")
+            self.version += 1
+            self.plot_plans.pop(col, None)
+            self.df.drop([col])
+            self._report(f"Column '{col}' dropped due to more than 50% missing values.")
             return False
         else:
+            # Columns without gaps get no overlay, so they stay shared with the base frame.
+            if total_missing > 0:
+                self.version += 1
             if pd.api.types.is_numeric_dtype(self.df[col]):
                 median_value = self.df[col].median()
-                self.df[col].fillna(median_value, inplace=True)
-                print(f"Filled missing values in numeric column '{col}' with median value {median_value}.")
+                if total_missing > 0:
+                    self.df.fillna(col, median_value)
+                    self.fills[col] = (int(total_missing), median_value)
+                self._report(f"Filled missing values in numeric column '{col}' with median value {median_value}.")
             else:
                 mode_value = self.df[col].mode()[0]
-                self.df[col].fillna(mode_value, inplace=True)
-                print(f"Filled missing values in non-numeric column '{col}' with mode value '{mode_value}'.")
+                if total_missing > 0:
+                    self.df.fillna(col, mode_value)
+                    self.fills[col] = (int(total_missing), mode_value)
+                self._report(f"Filled missing values in non-numeric column '{col}' with mode value '{mode_value}'.")
             return True
 
+    def _report(self, message):
+        print(message)
+        if self.classification is not None and self.classification[0] is None:
+            self.classification[1].append(message)
+
     def check_data_types(self, col):
-        if self.df[col].dtype == object:
+        if self.df.dtype(col) == object:
             try:
                 self.df[col] = pd.to_numeric(self.df[col])
-                print(f"Converted column '{col}' to numeric data type.")
+                self.fills.pop(col, None)
+                self.version += 1
+                self._report(f"Converted column '{col}' to numeric data type.")
             except ValueError:
-                print(f"Column '{col}' remains as object type.")
+                self._report(f"Column '{col}' remains as object type.")
 
-    def classify_and_calculate(self, col):
+    # Central tendencies of a filled column follow from the unfilled one and the
+    # fill value (a median or mode fill leaves the median or mode unchanged), so
+    # the filled column is only built when something plots or reads it.
+    def classify_and_calculate(self, col, profile=None, plot=False):
         if not self.handle_missing_values(col):
             return None
 
+        dtype_before = self.df.dtype(col)
         self.check_data_types(col)
-        unique_values = self.df[col].nunique()
-        is_numeric = pd.api.types.is_numeric_dtype(self.df[col])
+        converted = self.df.dtype(col) != dtype_before
+        missing, fill_value = (0, None) if converted else self.fills.get(col, (0, None))
+        is_numeric = pd.api.types.is_numeric_dtype(self.df.dtype(col))
+        series = self.df[col] if converted else self.df.unfilled(col)
+        if profile is not None and not converted and col in profile.stats.index and col not in self.df.overlays:
+            unique_values = profile.nunique(col)
+        else:
+            unique_values = series.nunique()
+        if missing and not (series == fill_value).any():
+            unique_values += 1
 
         central_tendency = None
 
         if is_numeric:
             if unique_values > 10:
-                central_tendency = self.df[col].mean()
-                print(f"Mean of '{col}': {central_tendency}")
-                self.plot_histogram(col)
+                count = series.count()
+                central_tendency = (series.mean() * count + fill_value * missing) / (count + missing) if missing else series.mean()
+                self._report(f"Mean of '{col}': {central_tendency}")
+                self.plot_plans[col] = ('plot_histogram', (col,))
             else:
-                central_tendency = self.df[col].median()
-                print(f"Median of ordinal numeric column '{col}': {central_tendency}")
-                self.plot_boxplot(col, col)
+                central_tendency = fill_value if missing else series.median()
+                self._report(f"Median of ordinal numeric column '{col}': {central_tendency}")
+                self.plot_plans[col] = ('plot_boxplot', (col, col))
         else:
-            central_tendency = self.df[col].mode()[0]
-            print(f"Mode of nominal column '{col}': {central_tendency}")
-            self.plot_bar_chart(col)
+            central_tendency = fill_value if missing else series.mode()[0]
+            self._report(f"Mode of nominal column '{col}': {central_tendency}")
+            self.plot_plans[col] = ('plot_bar_chart', (col,))
+
+        if plot:
+            self.plot_column(col)
 
         return central_tendency
 
-    def classify_columns(self):
-        for col in self.df.columns:
-            print(f"\nProcessing column: {col}")
-            self.classify_and_calculate(col)
+    # Plots are only planned here; plot_column or render_all_plots draws them on
+    # request. The printed classification is kept, so classifying the same data
+    # again (e.g. on a later menu visit) repeats it without recomputing anything.
+    def classify_columns(self, plot=False):
+        if self.classification is not None and self.classification[0] == (id(self.df), self.version):
+            print("\n".join(self.classification[1]))
+        else:
+            self.classification = (None, [])
+            profile = profile_columns(self.df.base)
+            for col in self.df.columns:
+                self._report(f"\nProcessing column: {col}")
+                self.classify_and_calculate(col, profile)
+            self.classification = ((id(self.df), self.version), self.classification[1])
+        if plot:
+            for col in self.plot_plans:
+                self.plot_column(col)
 
     def numeric_columns(self):
-        return [col for col in self.df.columns if pd.api.types.is_numeric_dtype(self.df[col])]
+        return [col for col in self.df.columns if pd.api.types.is_numeric_dtype(self.df.dtype(col))]
 
     def ordinal_columns(self):
-        return [col for col in self.df.columns if not pd.api.types.is_numeric_dtype(self.df[col])]
+        return [col for col in self.df.columns if not pd.api.types.is_numeric_dtype(self.df.dtype(col))]
+
+    # Bulk results are cached per data version; handle_missing_values and
+    # check_data_types bump the version when they change the frame.
+    def _cached(self, key, compute):
+        cache_key = (key, id(self.df), self.df.shape, self.version)
+        if cache_key not in self._stats_cache:
+            self._stats_cache = {k: v for k, v in self._stats_cache.items() if k[1:] == cache_key[1:]}
+            self._stats_cache[cache_key] = compute()
+        return self._stats_cache[cache_key]
+
+    # Spearman ranks each column once over its non-missing values, so it matches
+    # DataFrame.corr('spearman') exactly when the columns have no missing values.
+    def correlation_matrix(self, method='pearson', block_size=512):
+        def compute():
+            cols = self.numeric_columns()
+            values = self.df[cols].to_numpy(dtype=np.float64, na_value=np.nan)
+            if method == 'spearman':
+                values = rank_columns(values)
+            return pd.DataFrame(pairwise_correlation(values, block_size), index=cols, columns=cols)
+        return self._cached(('corr', method, block_size), compute)
+
+    def moment_statistics(self):
+        def compute():
+            stats = self.df.profile().stats
+            return stats.loc[self.numeric_columns(), ['count', 'mean', 'std', 'min', 'max', 'skew', 'kurt']].astype(float)
+        return self._cached(('moments',), compute)
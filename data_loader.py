@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+from running_stats import DistinctCounter, RunningMoments
+
+
+class StreamingLoader:
+    def __init__(self, file_path, chunksize=100000, max_categories=1000, category_ratio=0.5):
+        self.file_path = file_path
+        self.chunksize = chunksize
+        self.max_categories = max_categories
+        self.category_ratio = category_ratio
+        self.summary = None
+        self.dtypes = None
+
+    def load(self):
+        profile = self.scan()
+        self.dtypes = self.plan_dtypes(profile)
+        df = self.read_typed(self.dtypes)
+        self.summary = self.build_summary(df, profile)
+        df.attrs['column_summary'] = self.summary
+        return df
+
+    # First pass: one streaming scan that collects everything needed to pick
+    # compact dtypes and to summarise each column, holding one chunk at a time.
+    def scan(self):
+        profile = {}
+        for chunk in pd.read_csv(self.file_path, chunksize=self.chunksize):
+            self.update_profile(profile, chunk)
+        return profile
+
+    # Column states only ever grow by merging a new chunk in, so a profile can
+    # also be carried across runs and updated with appended rows.
+    def update_profile(self, profile, chunk):
+        for col in chunk.columns:
+            state = profile.setdefault(col, {
+                'rows': 0,
+                'numeric': True,
+                'integral': True,
+                'float32': True,
+                'bool': True,
+                'missing': 0,
+                'distinct': DistinctCounter(),
+                'values': set(),
+                'moments': RunningMoments(),
+            })
+            state['rows'] += len(chunk)
+            self._scan_column(state, chunk[col])
+        return profile
+
+    def _scan_column(self, state, series):
+        state['missing'] += int(series.isna().sum())
+        values = series.dropna()
+        if state['numeric'] and not pd.api.types.is_numeric_dtype(series):
+            state['numeric'] = False
+            state['moments'] = None
+        state['bool'] = state['bool'] and (pd.api.types.is_bool_dtype(series) or len(values) == 0)
+
+        if state['numeric'] and not state['bool']:
+            as_float = values.to_numpy(dtype=np.float64)
+            state['moments'].update(as_float)
+            if state['integral'] and not np.all(np.mod(as_float, 1) == 0):
+                state['integral'] = False
+            if state['float32'] and not np.array_equal(as_float.astype(np.float32).astype(np.float64), as_float):
+                state['float32'] = False
+        state['distinct'].update(self._hash_values(values))
+
+        if state['values'] is not None:
+            state['values'].update(values.unique())
+            if len(state['values']) > self.max_categories:
+                state['values'] = None
+
+    # A column can parse as numbers in one chunk and as text in the next, so
+    # values that read as numbers always hash as floats and only the rest as
+    # text; the same value counts once whichever way its chunk was parsed.
+    def _hash_values(self, values):
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            return pd.util.hash_array(values.to_numpy(dtype=np.float64))
+        text = values.astype(str)
+        numbers = pd.to_numeric(text, errors='coerce')
+        is_number = numbers.notna().to_numpy()
+        return np.concatenate((pd.util.hash_array(numbers.to_numpy(dtype=np.float64)[is_number]),
+                               pd.util.hash_array(text.to_numpy(dtype=object)[~is_number])))
+
+    def plan_dtypes(self, profile):
+        dtypes = {}
+        for col, state in profile.items():
+            count = state['rows'] - state['missing']
+            if state['bool']:
+                continue
+            if state['numeric']:
+                moments = state['moments']
+                if state['integral'] and state['missing'] == 0 and count > 0:
+                    dtypes[col] = self._smallest_int(moments.min, moments.max)
+                elif state['float32'] and count > 0:
+                    dtypes[col] = np.float32
+                else:
+                    dtypes[col] = np.float64
+            else:
+                nunique = state['distinct'].count()
+                if state['values'] is not None and count > 0 and nunique / count <= self.category_ratio:
+                    # A value parsed as a number in one chunk and as text in another
+                    # is one category.
+                    categories = sorted({str(value) for value in state['values']})
+                    dtypes[col] = pd.CategoricalDtype(categories)
+                else:
+                    dtypes[col] = object
+        return dtypes
+
+    def _smallest_int(self, low, high):
+        for dtype in (np.int8, np.int16, np.int32, np.int64):
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return dtype
+        return np.float64
+
+    # Second pass: parse straight into the planned dtypes, so the full-width
+    # frame that pd.read_csv would build is never materialised. iter_typed()
+    # yields one typed chunk at a time for callers that can work chunk by chunk.
+    def iter_typed(self, dtypes):
+        return pd.read_csv(self.file_path, chunksize=self.chunksize, dtype=dtypes)
+
+    # read_typed() returns the whole file as one frame: while the chunks are
+    # concatenated both are held, so the peak is about twice the typed frame
+    # (not the object-dtype frame), and files that do not fit twice in memory
+    # need iter_typed() instead.
+    def read_typed(self, dtypes):
+        chunks = list(self.iter_typed(dtypes))
+        if not chunks:
+            return pd.read_csv(self.file_path)
+        return pd.concat(chunks, ignore_index=True)
+
+    def build_summary(self, df, profile):
+        summary = {}
+        for col, state in profile.items():
+            count = state['rows'] - state['missing']
+            moments = state['moments']
+            row = {
+                'dtype': str(df[col].dtype),
+                'count': count,
+                'missing': state['missing'],
+                'missing_pct': (state['missing'] / state['rows']) * 100 if state['rows'] else 0.0,
+                'nunique': state['distinct'].count(),
+                'mean': np.nan,
+                'std': np.nan,
+                'min': np.nan,
+                'max': np.nan,
+                'skew': np.nan,
+                'kurt': np.nan,
+            }
+            if moments is not None and moments.n > 0:
+                row.update({
+                    'mean': moments.mean,
+                    'std': moments.std(),
+                    'min': moments.min,
+                    'max': moments.max,
+                    'skew': moments.skew(),
+                    'kurt': moments.kurt(),
+                })
+            summary[col] = row
+        return pd.DataFrame.from_dict(summary, orient='index')
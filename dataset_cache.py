@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import numpy as np
+import pandas as pd
+from column_profile import profile_columns, seed_profile
+from data_loader import StreamingLoader
+from text_column import TextColumn
+
+# Parsed datasets are cached next to the source CSV in <file>.cache/<mode>/: one .npy
+# file per column plus a manifest holding the source key (size, mtime, SHA-1),
+# the dtypes and the column profile. Numeric columns and category/string codes
+# are opened memory-mapped (copy-on-write), so a warm start parses nothing.
+CACHE_VERSION = 1
+
+
+def cache_dir(file_path, mode):
+    return os.path.join(f"{file_path}.cache", mode)
+
+
+def content_hash(file_path, block_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_key(file_path):
+    info = os.stat(file_path)
+    return {'size': info.st_size, 'mtime_ns': info.st_mtime_ns, 'sha1': content_hash(file_path)}
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_current(manifest, file_path, mode):
+    # Size and mtime are checked first; the content hash is only computed when
+    # the mtime moved, so a touched but unchanged file keeps its cache.
+    if manifest is None or manifest.get('version') != CACHE_VERSION or manifest.get('mode') != mode:
+        return False
+    info = os.stat(file_path)
+    source = manifest['source']
+    if info.st_size != source['size']:
+        return False
+    if info.st_mtime_ns == source['mtime_ns']:
+        return True
+    if content_hash(file_path) != source['sha1']:
+        return False
+    source['mtime_ns'] = info.st_mtime_ns
+    try:
+        with open(os.path.join(cache_dir(file_path, mode), 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+    except OSError:
+        pass
+    return True
+
+
+def _save_strings(directory, name, series):
+    column = TextColumn.from_values(series.to_numpy(dtype=object))
+    np.save(os.path.join(directory, f"{name}.codes.npy"), column.codes)
+    np.save(os.path.join(directory, f"{name}.offsets.npy"), column.offsets)
+    np.save(os.path.join(directory, f"{name}.text.npy"), column.text)
+
+
+def _mapped(path):
+    # A plain ndarray view keeps the file mapping but not the memmap subclass.
+    return np.load(path, mmap_mode='c').view(np.ndarray)
+
+
+def _load_strings(directory, name):
+    codes = _mapped(os.path.join(directory, f"{name}.codes.npy"))
+    offsets = np.load(os.path.join(directory, f"{name}.offsets.npy"))
+    text = np.load(os.path.join(directory, f"{name}.text.npy"))
+    return TextColumn(codes, offsets, text).to_numpy()
+
+
+def _all_strings(series):
+    values = series.dropna()
+    return bool(values.map(type).eq(str).all()) if len(values) else True
+
+
+def write_cache(df, file_path, mode, source, summary=None):
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        return False
+    directory = cache_dir(file_path, mode)
+    staging = f"{directory}.tmp{os.getpid()}"
+    columns = []
+    try:
+        os.makedirs(staging, exist_ok=True)
+        for i, col in enumerate(df.columns):
+            name = f"col{i:05d}"
+            series = df[col]
+            entry = {'name': col, 'file': name, 'dtype': str(series.dtype)}
+            if isinstance(series.dtype, pd.CategoricalDtype) and _all_strings(pd.Series(series.cat.categories)):
+                entry.update(kind='category', categories=[str(value) for value in series.cat.categories],
+                             ordered=bool(series.cat.ordered))
+                np.save(os.path.join(staging, f"{name}.npy"), series.cat.codes.to_numpy())
+            elif isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biufcmM':
+                entry['kind'] = 'array'
+                np.save(os.path.join(staging, f"{name}.npy"), series.to_numpy())
+            elif _all_strings(series):
+                entry['kind'] = 'strings'
+                _save_strings(staging, name, series)
+            else:
+                entry['kind'] = 'pickle'
+                np.save(os.path.join(staging, f"{name}.npy"), series.to_numpy(dtype=object), allow_pickle=True)
+            columns.append(entry)
+
+        manifest = {
+            'version': CACHE_VERSION,
+            'mode': mode,
+            'source': source,
+            'rows': len(df),
+            'columns': columns,
+            'profile': profile_columns(df).stats.to_dict(orient='split'),
+            'summary': None if summary is None else summary.to_dict(orient='split'),
+        }
+        with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+
+        # Swap the finished directory in, so readers never see a half-written cache.
+        retired = f"{directory}.old{os.getpid()}"
+        if os.path.exists(directory):
+            os.rename(directory, retired)
+        os.rename(staging, directory)
+        shutil.rmtree(retired, ignore_errors=True)
+        return True
+    except OSError as e:
+        print(f"Could not write dataset cache: {e}")
+        shutil.rmtree(staging, ignore_errors=True)
+        return False
+
+
+def _read_columns(directory, manifest):
+    data = {}
+    for entry in manifest['columns']:
+        path = os.path.join(directory, f"{entry['file']}.npy")
+        if entry['kind'] == 'array':
+            data[entry['name']] = _mapped(path)
+        elif entry['kind'] == 'category':
+            data[entry['name']] = pd.Categorical.from_codes(_mapped(path), entry['categories'],
+                                                           ordered=entry['ordered'])
+        elif entry['kind'] == 'strings':
+            data[entry['name']] = pd.Series(_load_strings(directory, entry['file']), dtype=entry['dtype'], copy=False)
+        else:
+            data[entry['name']] = pd.Series(np.load(path, allow_pickle=True), dtype=entry['dtype'], copy=False)
+        if len(data[entry['name']]) != manifest['rows']:
+            raise ValueError(f"{path} holds {len(data[entry['name']])} rows, expected {manifest['rows']}")
+    return data
+
+
+# A cache with a missing, truncated or corrupt file is removed and None is
+# returned, so load_dataset parses the CSV again and writes a fresh cache.
+def read_cache(file_path, mode):
+    directory = cache_dir(file_path, mode)
+    manifest = _read_manifest(directory)
+    try:
+        if not _is_current(manifest, file_path, mode):
+            return None
+        df = pd.DataFrame(_read_columns(directory, manifest), index=pd.RangeIndex(manifest['rows']), copy=False)
+        stats = pd.DataFrame(**manifest['profile']).astype({'numeric': bool})
+        summary = None if manifest['summary'] is None else pd.DataFrame(**manifest['summary'])
+    except (OSError, ValueError, KeyError, TypeError, EOFError, pickle.UnpicklingError) as e:
+        print(f"Discarding unreadable dataset cache in {directory}: {e}")
+        shutil.rmtree(directory, ignore_errors=True)
+        return None
+
+    seed_profile(df, stats)
+    if summary is not None:
+        df.attrs['column_summary'] = summary
+    return df
+
+
+def load_dataset(file_path, streaming=False, use_cache=True):
+    mode = 'streaming' if streaming else 'read_csv'
+    if use_cache:
+        df = read_cache(file_path, mode)
+        if df is not None:
+            print(f"Loaded {file_path} from the binary cache in {cache_dir(file_path, mode)}")
+            return df
+
+    source = source_key(file_path) if use_cache else None
+    summary = None
+    if streaming:
+        loader = StreamingLoader(file_path)
+        df = loader.load()
+        summary = loader.summary
+    else:
+        df = pd.read_csv(file_path)
+    if use_cache:
+        write_cache(df, file_path, mode, source, summary)
+    return df
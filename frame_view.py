@@ -0,0 +1,117 @@
+import pandas as pd
+from column_profile import ColumnProfile, compute_stats, profile_columns
+
+
+class FrameView:
+    # Copy-on-write view over a shared base DataFrame. Imputations and type
+    # conversions are recorded as per-column overlays (lazy ones are only computed
+    # when the column is read), so the base frame is never copied or mutated.
+    def __init__(self, base):
+        self.base = base
+        self.overlays = {}
+        self.lazy = {}
+        self.dropped = set()
+        self.fills = set()
+        self.revision = 0
+        self._profile = None
+
+    @property
+    def columns(self):
+        columns = [col for col in self.base.columns if col not in self.dropped]
+        columns += [col for col in list(self.overlays) + list(self.lazy) if col not in self.base.columns and col not in columns]
+        return pd.Index(columns)
+
+    @property
+    def shape(self):
+        return len(self.base), len(self.columns)
+
+    # Goes through dtype(), so pending fills are not applied just to read dtypes.
+    @property
+    def dtypes(self):
+        return pd.Series({col: self.dtype(col) for col in self.columns})
+
+    def __len__(self):
+        return len(self.base)
+
+    def __contains__(self, col):
+        return col in self.columns
+
+    def __getitem__(self, key):
+        if isinstance(key, (list, pd.Index)):
+            return pd.DataFrame({col: self[col] for col in key}, copy=False)
+        if key in self.dropped or (key not in self.base.columns and key not in self.overlays and key not in self.lazy):
+            raise KeyError(key)
+        if key in self.lazy:
+            self.overlays[key] = self.lazy.pop(key)(self._source(key))
+            self.fills.discard(key)
+        if key in self.overlays:
+            return self.overlays[key]
+        return self.base[key]
+
+    def __setitem__(self, col, value):
+        self.lazy.pop(col, None)
+        self.fills.discard(col)
+        self.dropped.discard(col)
+        if not isinstance(value, pd.Series):
+            value = pd.Series(value, index=self.base.index, name=col)
+        self.overlays[col] = value
+        self._changed()
+
+    def _changed(self):
+        self.revision += 1
+
+    def _source(self, col):
+        if col in self.overlays:
+            return self.overlays[col]
+        return self.base[col]
+
+    # The column as it was before its pending lazy operations.
+    def unfilled(self, col):
+        if col in self.dropped:
+            raise KeyError(col)
+        return self._source(col)
+
+    # Pending fills keep the dtype, so a filled column's dtype is known without
+    # building it; other lazy operations are applied first.
+    def dtype(self, col):
+        if col in self.lazy and col in self.fills:
+            return self.unfilled(col).dtype
+        return self[col].dtype
+
+    def apply_lazy(self, col, func):
+        if col in self.lazy:
+            previous = self.lazy[col]
+            self.lazy[col] = lambda series: func(previous(series))
+        else:
+            self.lazy[col] = func
+        self.fills.discard(col)
+        self._changed()
+
+    def fillna(self, col, value):
+        keeps_dtype = col not in self.lazy or col in self.fills
+        self.apply_lazy(col, lambda series: series.fillna(value))
+        if keeps_dtype:
+            self.fills.add(col)
+
+    def drop(self, columns):
+        for col in columns:
+            self.dropped.add(col)
+            self.overlays.pop(col, None)
+            self.lazy.pop(col, None)
+            self.fills.discard(col)
+        self._changed()
+
+    # Column profile of the view, cached on the base frame and the overlay
+    # revision. Untouched columns reuse the base frame's profile (itself cached by
+    # profile_columns), so only overlaid columns are read and recomputed.
+    def profile(self):
+        key = (id(self.base), self.revision)
+        if self._profile is None or self._profile[0] != key:
+            stats = profile_columns(self.base).stats
+            changed = [col for col in self.columns if col in self.overlays or col in self.lazy]
+            kept = [col for col in self.columns if col not in changed]
+            parts = [stats.loc[kept]]
+            if changed:
+                parts.append(compute_stats(self[changed]))
+            self._profile = (key, ColumnProfile(pd.concat(parts).loc[list(self.columns)]))
+        return self._profile[1]
@@ -0,0 +1,382 @@
+import hashlib
+import io
+import os
+import pickle
+import numpy as np
+import pandas as pd
+from column_profile import ColumnProfile
+from contingency import ContingencyCounts
+from data_loader import StreamingLoader
+from regression import RegressionAccumulator, check_predictors
+from running_stats import DistinctCounter, GroupMoments, GroupRankSums
+
+STATE_FILE = 'incremental.pkl'
+
+# Results built on order statistics, ranks of the whole column or a sample drawn
+# from its full range cannot be updated from the new rows alone. Those computed
+# for the file are recorded with note_computed(); after rows are appended they
+# are listed in IncrementalAnalysis.stale until they are recomputed.
+NON_MERGEABLE = {
+    'central_tendency': "medians and modes need the whole column",
+    'spearman_correlation': "ranks change when rows are added",
+    'mann_whitney': "ranks change when rows are added",
+    'normality_sample': "stratified Shapiro-Wilk sample depends on the full value range",
+    'pair_screening': "ranks and FDR correction over every pair",
+    'resampling': "permutation and bootstrap draws cover every row",
+}
+
+
+class _ByteRange(io.RawIOBase):
+    # Read-only view of bytes [start, end) of a file, so pandas can parse just
+    # the appended region without it being copied into memory first.
+    def __init__(self, f, start, end):
+        self.f = f
+        self.f.seek(start)
+        self.remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.remaining)
+        if size <= 0:
+            return 0
+        data = self.f.read(size)
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+
+def _hash_range(digest, file_path, start, end, block_size=1 << 20):
+    length = end - start
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(block_size, length))
+            if not block:
+                break
+            digest.update(block)
+            length -= len(block)
+    return digest
+
+
+def _complete_end(file_path):
+    # Offset just past the last newline: a trailing row without one may still be
+    # being written, so it is left for the next refresh.
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        position = size
+        while position > 0:
+            start = max(0, position - (1 << 16))
+            f.seek(start)
+            block = f.read(position - start)
+            newline = block.rfind(b'\n')
+            if newline >= 0:
+                return start + newline + 1
+            position = start
+    return 0
+
+
+def _accumulator(spec):
+    if spec[0] == 'group':
+        return GroupRankSums() if spec[3] else GroupMoments()
+    if spec[0] == 'chi_square':
+        return ContingencyCounts()
+    return RegressionAccumulator(spec[1], spec[2])
+
+
+class IncrementalAnalysis:
+    # Mergeable statistics for a CSV that only grows by appended rows. The state
+    # remembers how many bytes were processed and a hash of them; refresh() parses
+    # only the bytes after that point when the prefix is unchanged and starts over
+    # when it is not. Column profiles, group tests, contingency tables, regression
+    # cross-products and sentiment scores are all updated from the new rows only.
+    def __init__(self, file_path, state_path=None, chunksize=100000):
+        self.file_path = file_path
+        self.state_path = state_path or os.path.join(f"{file_path}.cache", STATE_FILE)
+        self.chunksize = chunksize
+        self.rows = 0
+        self.offset = 0
+        self.prefix_sha1 = None
+        self.header = None
+        self.profile_state = {}
+        self.tests = {}
+        self.sentiment = {}
+        self.computed = {}
+        self.stale = {}
+
+    @classmethod
+    def open(cls, file_path, state_path=None, chunksize=100000):
+        analysis = cls(file_path, state_path, chunksize)
+        try:
+            with open(analysis.state_path, 'rb') as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return analysis
+        state.pop('file_path', None)
+        state.pop('state_path', None)
+        state.pop('chunksize', None)
+        analysis.__dict__.update(state)
+        analysis.stale = {name: reason for name, reason in analysis.stale.items() if name in analysis.computed}
+        for column in analysis.profile_state.values():
+            if 'hashes' in column:
+                # States saved before distinct counts were bounded kept every hash.
+                column['distinct'] = DistinctCounter().update(column.pop('hashes'))
+        return analysis
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        staging = f"{self.state_path}.tmp{os.getpid()}"
+        with open(staging, 'wb') as f:
+            pickle.dump(self.__dict__, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(staging, self.state_path)
+
+    # A spec is checked before it is saved, against df (the loaded dataset) or
+    # else the first rows of the file, so a test that can never be computed is
+    # not tracked. The tracking methods raise ValueError for a bad spec.
+    def _check_columns(self, df, columns, numeric=()):
+        if df is None:
+            df = pd.read_csv(self.file_path, nrows=self.chunksize)
+        missing = [col for col in columns if col not in df.columns]
+        if missing:
+            raise ValueError(f"Columns not found: {missing}.")
+        if len(set(columns)) < len(columns):
+            raise ValueError(f"The same column cannot be used twice: {list(columns)}.")
+        non_numeric = [col for col in numeric if not pd.api.types.is_numeric_dtype(df[col])]
+        if non_numeric:
+            raise ValueError(f"Numeric columns are needed: {non_numeric}.")
+        return df
+
+    def track_group_test(self, continuous, categorical, skewed, df=None):
+        self._check_columns(df, [continuous, categorical], numeric=[continuous])
+        name = f"{'kruskal' if skewed else 'anova'}:{continuous}~{categorical}"
+        return self._track(name, ('group', continuous, categorical, skewed))
+
+    def track_chi_square(self, categorical_1, categorical_2, df=None):
+        self._check_columns(df, [categorical_1, categorical_2])
+        name = f"chi_square:{categorical_1}~{categorical_2}"
+        return self._track(name, ('chi_square', categorical_1, categorical_2))
+
+    def track_regression(self, x_vars, y_var, df=None):
+        x_vars = [x_vars] if isinstance(x_vars, str) else list(x_vars)
+        check_predictors(self._check_columns(df, list(dict.fromkeys(x_vars + [y_var]))), x_vars, y_var)
+        name = f"regression:{y_var}~{'+'.join(x_vars)}"
+        return self._track(name, ('regression', tuple(x_vars), y_var))
+
+    def track_sentiment(self, column, engine='vader', df=None):
+        from sentiment_analysis import RESULT_COLUMNS, is_text_column
+        if engine not in RESULT_COLUMNS:
+            raise ValueError(f"Unknown sentiment engine '{engine}'.")
+        df = self._check_columns(df, [column])
+        if not is_text_column(df[column]):
+            raise ValueError(f"'{column}' is not a text column.")
+        name = f"sentiment:{column}:{engine}"
+        if name not in self.sentiment:
+            self.sentiment[name] = {'column': column, 'engine': engine, 'rows': np.empty(0, dtype=np.int64),
+                                    'columns': None, 'pending': True}
+        return name
+
+    def tracked(self):
+        return list(self.tests) + list(self.sentiment)
+
+    def untrack(self, name):
+        if name not in self.tests and name not in self.sentiment:
+            raise KeyError(f"'{name}' is not tracked.")
+        self.tests.pop(name, None)
+        self.sentiment.pop(name, None)
+        self.save()
+
+    # A test tracked after rows were already processed has not seen them, so it
+    # is marked pending and the next refresh replays the file from the start.
+    def _track(self, name, spec):
+        if name not in self.tests:
+            self.tests[name] = {'spec': spec, 'accumulator': _accumulator(spec), 'pending': True, 'error': None}
+        return name
+
+    def _pending(self):
+        return (any(test['pending'] for test in self.tests.values())
+                or any(entry['pending'] for entry in self.sentiment.values()))
+
+    def _reset(self):
+        self.rows = 0
+        self.offset = 0
+        self.prefix_sha1 = None
+        self.header = None
+        self.profile_state = {}
+        for test in self.tests.values():
+            test['error'] = None
+            try:
+                test['accumulator'] = _accumulator(test['spec'])
+            except ValueError as e:
+                test['error'] = f"ValueError: {e}"
+        for entry in self.sentiment.values():
+            entry['rows'] = np.empty(0, dtype=np.int64)
+            entry['columns'] = None
+
+    def refresh(self, sentiment_cache=None, **sentiment_options):
+        end = _complete_end(self.file_path)
+        had_rows = self.rows > 0
+        # The verified prefix digest is extended over the new bytes afterwards, so
+        # the file is read once for hashing.
+        digest = _hash_range(hashlib.sha1(), self.file_path, 0, self.offset if end >= self.offset else 0)
+        appended = self.prefix_sha1 is not None and end >= self.offset and digest.hexdigest() == self.prefix_sha1
+        # Replaying an unchanged file for a newly tracked test changes no results.
+        changed = not appended or end > self.offset
+        if not appended or self._pending():
+            if self.offset > 0:
+                digest = hashlib.sha1()
+            self._reset()
+
+        new_rows = 0
+        loader = StreamingLoader(self.file_path, chunksize=self.chunksize)
+        if end > self.offset:
+            with open(self.file_path, 'rb') as f:
+                source = io.BufferedReader(_ByteRange(f, self.offset, end))
+                if self.header is None:
+                    reader = pd.read_csv(source, chunksize=self.chunksize)
+                else:
+                    reader = pd.read_csv(source, header=None, names=self.header, chunksize=self.chunksize)
+                for chunk in reader:
+                    if self.header is None:
+                        self.header = list(chunk.columns)
+                    chunk.index = pd.RangeIndex(self.rows, self.rows + len(chunk))
+                    loader.update_profile(self.profile_state, chunk)
+                    self._update_tests(chunk)
+                    self._update_sentiment(chunk, sentiment_cache, sentiment_options)
+                    self.rows += len(chunk)
+                    new_rows += len(chunk)
+        for entry in list(self.tests.values()) + list(self.sentiment.values()):
+            entry['pending'] = False
+
+        if had_rows and changed:
+            self.stale.update({name: NON_MERGEABLE[entry['kind']] for name, entry in self.computed.items()})
+        self.prefix_sha1 = _hash_range(digest, self.file_path, self.offset, end).hexdigest()
+        self.offset = end
+        self.save()
+        return new_rows
+
+    # A chunk a test cannot use (a column that turns to text further down the
+    # file, say) stops that test with an error instead of failing the refresh.
+    def _update_tests(self, chunk):
+        for test in self.tests.values():
+            if test.get('error'):
+                continue
+            spec, accumulator = test['spec'], test['accumulator']
+            try:
+                if spec[0] == 'group':
+                    accumulator.update(chunk[spec[1]], chunk[spec[2]])
+                elif spec[0] == 'chi_square':
+                    accumulator.update(chunk[spec[1]], chunk[spec[2]])
+                else:
+                    accumulator.update_frame(chunk)
+            except (KeyError, TypeError, ValueError) as e:
+                test['error'] = f"{type(e).__name__}: {e}"
+
+    def _update_sentiment(self, chunk, cache, options):
+        if not self.sentiment:
+            return
+        from sentiment_analysis import SentimentAnalysis
+        sa = SentimentAnalysis(chunk, cache=cache)
+        for entry in self.sentiment.values():
+            texts = chunk[entry['column']].dropna()
+            if len(texts) == 0:
+                continue
+            columns = [np.asarray(column) for column in sa.analyze(entry['engine'], texts, **options)]
+            entry['rows'] = np.concatenate((entry['rows'], texts.index.to_numpy(dtype=np.int64)))
+            if entry['columns'] is None:
+                entry['columns'] = columns
+            else:
+                entry['columns'] = [np.concatenate((old, new)) for old, new in zip(entry['columns'], columns)]
+
+    # test is the batch runner spec that produced the result, so recompute() can
+    # run it again on the whole file.
+    def note_computed(self, name, kind, test):
+        if kind not in NON_MERGEABLE:
+            raise ValueError(f"Unknown non-mergeable result kind '{kind}'.")
+        self.computed[name] = {'kind': kind, 'test': test}
+        self.stale.pop(name, None)
+        self.save()
+
+    def mark_recomputed(self, name):
+        self.stale.pop(name, None)
+        self.save()
+
+    def forget(self, name):
+        self.computed.pop(name, None)
+        self.stale.pop(name, None)
+        self.save()
+
+    # Runs every stale result's test on df, the whole file as it is now, and
+    # clears the ones that succeed; returns {name: result or {'error': ...}}.
+    def recompute(self, df, output_dir=os.path.join('results', 'incremental')):
+        from batch_runner import BatchJob
+        batch = BatchJob({'name': 'recompute', 'dataset': self.file_path}, output_dir)
+        batch.df = df
+        os.makedirs(output_dir, exist_ok=True)
+        results = {}
+        for index, name in enumerate(list(self.stale)):
+            test = dict(self.computed[name]['test'], plot=False)
+            try:
+                results[name] = batch.run_test(index, test)
+            except Exception as e:
+                results[name] = {'error': f"{type(e).__name__}: {e}"}
+                continue
+            self.stale.pop(name)
+        self.save()
+        return results
+
+    def profile(self):
+        # Same table profile_columns() builds, so classify() works unchanged.
+        stats = {}
+        for col, state in self.profile_state.items():
+            moments = state['moments']
+            has_moments = moments is not None and moments.n > 0
+            stats[col] = {
+                'dtype': 'numeric' if state['numeric'] else 'object',
+                'numeric': state['numeric'],
+                'count': state['rows'] - state['missing'],
+                'missing': state['missing'],
+                'nunique': state['distinct'].count(),
+                'min': moments.min if has_moments else np.nan,
+                'max': moments.max if has_moments else np.nan,
+                'mean': moments.mean if has_moments else np.nan,
+                'std': moments.std() if has_moments else np.nan,
+                'skew': moments.skew() if has_moments else np.nan,
+                'kurt': moments.kurt() if has_moments else np.nan,
+            }
+        return ColumnProfile(pd.DataFrame.from_dict(stats, orient='index'))
+
+    # A test that cannot be computed (a rank-deficient regression, too few rows)
+    # is reported as its own result, so it does not hide the other tests.
+    def results(self):
+        results = {}
+        for name, test in self.tests.items():
+            if test.get('error'):
+                results[name] = {'error': test['error']}
+                continue
+            try:
+                results[name] = self._test_result(test)
+            except Exception as e:
+                results[name] = {'error': f"{type(e).__name__}: {e}"}
+        for name, entry in self.sentiment.items():
+            results[name] = {'rows': len(entry['rows'])}
+            if entry['columns'] is not None:
+                results[name]['sentiment_counts'] = pd.Series(entry['columns'][1]).value_counts().to_dict()
+        return results
+
+    def _test_result(self, test):
+        spec, accumulator = test['spec'], test['accumulator']
+        if spec[0] == 'group':
+            stat, p_value = accumulator.kruskal() if spec[3] else accumulator.anova()
+            return {'test': 'Kruskal-Wallis Test' if spec[3] else 'ANOVA', 'statistic': stat, 'p_value': p_value}
+        if spec[0] == 'chi_square':
+            chi2, p_value, dof = accumulator.chi2()
+            return {'test': 'Chi-square Test', 'chi2': chi2, 'p_value': p_value, 'dof': dof}
+        return accumulator.fit().as_dict()
+
+    def sentiment_frame(self, name):
+        entry = self.sentiment[name]
+        names = ['Polarity Score', 'Sentiment', 'Subjectivity'] if entry['engine'] == 'textblob' else ['Score', 'Sentiment']
+        if entry['columns'] is None:
+            return pd.DataFrame(columns=names)
+        return pd.DataFrame(dict(zip(names, entry['columns'])), index=entry['rows'])
@@ -0,0 +1,248 @@
+import cProfile
+import functools
+import inspect
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_TRACE = 'analysis_trace.jsonl'
+MODES = (None, 'cprofile', 'tracemalloc')
+
+# Instrumentation is off unless enable() is called (or ANALYSIS_TRACE is set);
+# while it is off a wrapped method costs one attribute check.
+_state = {
+    'enabled': False,
+    'mode': None,
+    'path': DEFAULT_TRACE,
+    'top': 15,
+    'records': [],
+    'stack': [],
+}
+
+
+def enable(path=DEFAULT_TRACE, mode=None, top=15):
+    if mode not in MODES:
+        raise ValueError(f"Unknown instrumentation mode '{mode}'; choose from {MODES}.")
+    if mode == 'tracemalloc' and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _state.update(enabled=True, mode=mode, path=path, top=top)
+
+
+def disable():
+    if _state['mode'] == 'tracemalloc' and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _state.update(enabled=False, mode=None)
+
+
+def is_enabled():
+    return _state['enabled']
+
+
+def trace_path():
+    return _state['path']
+
+
+def records():
+    return list(_state['records'])
+
+
+def _process_peak_rss_mb():
+    # Fallback where the peak cannot be reset: ru_maxrss is the process
+    # high-water mark so far, not the peak of one call (kilobytes on Linux, bytes
+    # on macOS).
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def _rss_mb():
+    # Current and peak resident set size from /proc (Linux), or None elsewhere.
+    try:
+        with open('/proc/self/status') as f:
+            fields = dict(line.split(':', 1) for line in f if line.startswith(('VmRSS', 'VmHWM')))
+        return int(fields['VmRSS'].split()[0]) / 2 ** 10, int(fields['VmHWM'].split()[0]) / 2 ** 10
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _reset_rss_peak():
+    # Writing 5 to clear_refs resets VmHWM to the current RSS, so the peak read at
+    # the end of a call is the peak reached during it.
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _rows(args, kwargs):
+    # Rows processed: the first DataFrame/Series/array/list argument (a list of
+    # the instance's column names does not count), otherwise the frame the
+    # instance is working on.
+    df = getattr(args[0], 'df', None) if args else None
+    columns = set(getattr(df, 'columns', ()))
+    for value in list(args) + list(kwargs.values()):
+        if hasattr(value, 'shape') and len(getattr(value, 'shape', ())) > 0:
+            return int(value.shape[0])
+        if isinstance(value, (list, tuple)) and value:
+            if all(isinstance(item, str) and item in columns for item in value):
+                continue
+            return len(value)
+    shape = getattr(df, 'shape', None)
+    return int(shape[0]) if shape else None
+
+
+def _top_functions(profiler, top):
+    stats = pstats.Stats(profiler)
+    entries = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:top]
+    return [{'function': f"{os.path.basename(file)}:{line}({func})", 'calls': calls,
+             'total_s': total, 'cumulative_s': cumulative}
+            for (file, line, func), (_, calls, total, cumulative, _) in entries]
+
+
+def _write(record):
+    _state['records'].append(record)
+    try:
+        with open(_state['path'], 'a') as f:
+            f.write(json.dumps(record, default=str) + '\n')
+    except OSError as e:
+        print(f"Could not write trace record: {e}")
+
+
+def _call(name, func, args, kwargs):
+    stack = _state['stack']
+    frame = {'traced_peak': 0, 'rss_peak': 0.0}
+    outermost = not stack
+    mode = _state['mode']
+    profiler = cProfile.Profile() if mode == 'cprofile' and outermost else None
+    traced_start = None
+    if mode == 'tracemalloc' and tracemalloc.is_tracing():
+        traced_start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    rss_start = _rss_mb()
+    if rss_start is not None and not _reset_rss_peak():
+        rss_start = None
+
+    stack.append(frame)
+    error = None
+    start_children = os.times()
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    try:
+        if profiler is not None:
+            return profiler.runcall(func, *args, **kwargs)
+        return func(*args, **kwargs)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        wall = time.perf_counter() - start
+        cpu = time.process_time() - start_cpu
+        end_children = os.times()
+        stack.pop()
+        record = {
+            'name': name,
+            'timestamp': time.time(),
+            'pid': os.getpid(),
+            'depth': len(stack),
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'child_cpu_s': (end_children.children_user - start_children.children_user
+                            + end_children.children_system - start_children.children_system),
+            'rows': _rows(args, kwargs),
+        }
+        rss_end = _rss_mb() if rss_start is not None else None
+        if rss_end is None:
+            record['process_peak_rss_mb'] = _process_peak_rss_mb()
+        else:
+            # Like the tracemalloc peak below, a nested call resets VmHWM, so the
+            # children's peaks are carried up to their parent.
+            peak = max(rss_end[1], frame['rss_peak'])
+            record['rss_start_mb'] = rss_start[0]
+            record['peak_rss_mb'] = peak
+            record['peak_rss_delta_mb'] = max(peak - rss_start[0], 0.0)
+            if stack:
+                stack[-1]['rss_peak'] = max(stack[-1]['rss_peak'], peak)
+        if traced_start is not None:
+            # A nested call resets the tracemalloc peak, so each frame keeps the
+            # highest peak seen by its children as well.
+            peak = max(tracemalloc.get_traced_memory()[1], frame['traced_peak'])
+            record['traced_peak_mb'] = max(peak - traced_start, 0) / 2 ** 20
+            if stack:
+                stack[-1]['traced_peak'] = max(stack[-1]['traced_peak'], peak)
+        if profiler is not None:
+            record['profile'] = _top_functions(profiler, _state['top'])
+        if error is not None:
+            record['error'] = error
+        _write(record)
+
+
+def instrumented(func, name=None):
+    name = name or func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _state['enabled']:
+            return func(*args, **kwargs)
+        return _call(name, func, args, kwargs)
+    return wrapper
+
+
+def instrument_class(exclude=()):
+    # Wraps every public method; methods that wait on input() belong in exclude
+    # so prompts are not counted as analysis time. Generators are skipped, since
+    # calling one only creates it.
+    def decorate(cls):
+        for attr, value in list(vars(cls).items()):
+            if (attr.startswith('_') or attr in exclude or not inspect.isfunction(value)
+                    or inspect.isgeneratorfunction(value)):
+                continue
+            setattr(cls, attr, instrumented(value, f"{cls.__name__}.{attr}"))
+        return cls
+    return decorate
+
+
+def summary(path=None):
+    # Per-method totals for this session's calls, or for every record in a
+    # trace file when path is given.
+    import pandas as pd
+    if path is None:
+        rows = records()
+    else:
+        with open(path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    columns = ['calls', 'wall_s', 'mean_wall_s', 'max_wall_s', 'cpu_s', 'child_cpu_s', 'rows']
+    if not rows:
+        return pd.DataFrame(columns=columns)
+    frame = pd.DataFrame(rows)
+    grouped = frame.groupby('name')
+    table = pd.DataFrame({
+        'calls': grouped.size(),
+        'wall_s': grouped['wall_s'].sum(),
+        'mean_wall_s': grouped['wall_s'].mean(),
+        'max_wall_s': grouped['wall_s'].max(),
+        'cpu_s': grouped['cpu_s'].sum(),
+        'child_cpu_s': grouped['child_cpu_s'].sum(),
+        'rows': grouped['rows'].sum(min_count=1),
+    })
+    for field in ('peak_rss_mb', 'peak_rss_delta_mb', 'process_peak_rss_mb'):
+        if field in frame:
+            table[f"max_{field}"] = grouped[field].max()
+    if 'traced_peak_mb' in frame:
+        table['max_traced_peak_mb'] = grouped['traced_peak_mb'].max()
+    return table.sort_values('wall_s', ascending=False)
+
+
+if os.environ.get('ANALYSIS_TRACE'):
+    enable(os.environ['ANALYSIS_TRACE'] if os.environ['ANALYSIS_TRACE'] not in ('1', 'true') else DEFAULT_TRACE,
+           os.environ.get('ANALYSIS_TRACE_MODE') or None)
@@ -0,0 +1,250 @@
+import asyncio
+import collections
+import contextlib
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sentiment_analysis import RESULT_COLUMNS, deduplicate_column, engine_version, expand, result_frame
+from text_column import TextColumn
+
+# The session's DataFrame is sent to each worker once by the pool initializer, so
+# a job only ships its test spec or its chunk of texts.
+_shared = {}
+
+
+def _init_frame(df):
+    _shared['df'] = df
+
+
+# Statistics jobs are batch runner test specs ({"type": "hypothesis", ...}), run
+# the same way a batch job runs them; printed output is kept with the result.
+def _run_test(job_id, test, output_dir):
+    import matplotlib
+    matplotlib.use('Agg')
+    from batch_runner import BatchJob
+    batch = BatchJob({'name': f"job{job_id}", 'dataset': ''}, output_dir)
+    batch.df = _shared['df']
+    os.makedirs(output_dir, exist_ok=True)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        result = batch.run_test(job_id, test)
+    return result, output.getvalue()
+
+
+def _score_batch(engine, texts, options):
+    from sentiment_analysis import SentimentAnalysis
+    columns = SentimentAnalysis(None).engines[engine](texts, **options)
+    return [np.asarray(column) for column in columns]
+
+
+class Job:
+    def __init__(self, job_id, name, kind, total):
+        self.id = job_id
+        self.name = name
+        self.kind = kind
+        self.status = 'queued'
+        self.total = total
+        self.done = 0
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.output = ''
+        self.error = None
+        self.future = None
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def throughput(self):
+        elapsed = self.elapsed()
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def row(self):
+        return {
+            'Job': self.id,
+            'Name': self.name,
+            'Status': self.status,
+            'Progress (%)': 100.0 * self.done / self.total if self.total else 100.0 * (self.status == 'done'),
+            'Rows': f"{self.done}/{self.total}",
+            'Rows/s': self.throughput(),
+            'Elapsed (s)': self.elapsed(),
+        }
+
+
+class ResultStore:
+    # Every job submitted in the session, finished or not, in submission order.
+    def __init__(self):
+        self.jobs = {}
+
+    def add(self, job):
+        self.jobs[job.id] = job
+
+    def get(self, job_id):
+        if job_id not in self.jobs:
+            raise KeyError(f"No job with id {job_id}.")
+        return self.jobs[job_id]
+
+    def table(self):
+        return pd.DataFrame([job.row() for job in self.jobs.values()],
+                            columns=['Job', 'Name', 'Status', 'Progress (%)', 'Rows', 'Rows/s', 'Elapsed (s)'])
+
+    def export(self, job_id, path):
+        job = self.get(job_id)
+        if job.status != 'done':
+            raise ValueError(f"Job {job_id} is {job.status}; only finished jobs can be exported.")
+        if isinstance(job.result, pd.DataFrame):
+            if path.endswith('.parquet'):
+                job.result.to_parquet(path)
+            else:
+                job.result.to_csv(path)
+        else:
+            from batch_runner import to_builtin
+            with open(path, 'w') as f:
+                json.dump({'name': job.name, 'result': job.result, 'output': job.output}, f, indent=2,
+                          default=to_builtin)
+        return path
+
+
+class JobQueue:
+    # Runs analyses in the background so the menu stays responsive. An asyncio
+    # event loop on a daemon thread drives the jobs and hands the work to one
+    # process pool shared by all of them, so several jobs run at once. Sentiment
+    # jobs are split into chunks, which gives progress and throughput as chunks
+    # finish and lets a cancelled job drop the chunks that have not started. A
+    # statistics test is a single task: cancelling it discards its result, but a
+    # test that is already running finishes in its worker.
+    def __init__(self, df, workers=None, output_dir=os.path.join('results', 'jobs'), sentiment_cache=None):
+        self.df = df
+        self.output_dir = output_dir
+        self.sentiment_cache = sentiment_cache
+        self.store = ResultStore()
+        self.next_id = 1
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_frame, initargs=(df,))
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def _new_job(self, name, kind, total):
+        job = Job(self.next_id, name, kind, total)
+        self.next_id += 1
+        self.store.add(job)
+        return job
+
+    def _start(self, job, work):
+        job.future = asyncio.run_coroutine_threadsafe(self._run(job, work), self.loop)
+        return job.id
+
+    async def _run(self, job, work):
+        job.status = 'running'
+        job.started = time.time()
+        try:
+            job.result = await work
+            job.status = 'done'
+        except asyncio.CancelledError:
+            job.status = 'cancelled'
+        except Exception as e:
+            job.status = 'failed'
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            job.finished = time.time()
+
+    def submit_test(self, test, name=None):
+        job = self._new_job(name or test['type'], 'test', len(self.df))
+        return self._start(job, self._test(job, test))
+
+    async def _test(self, job, test):
+        future = self.loop.run_in_executor(self.executor, _run_test, job.id, test, self.output_dir)
+        result, job.output = await future
+        job.done = job.total
+        return result
+
+    def submit_sentiment(self, column, engine='vader', chunk_size=2000, name=None, **options):
+        if engine not in RESULT_COLUMNS:
+            raise ValueError(f"Unknown sentiment engine '{engine}'.")
+        # Workers receive only the distinct texts that still need scoring.
+        texts = TextColumn.from_series(self.df[column])
+        job = self._new_job(name or f"sentiment:{column}:{engine}", 'sentiment', int(texts.present().sum()))
+        return self._start(job, self._sentiment(job, texts, engine, chunk_size, options))
+
+    async def _sentiment(self, job, texts, engine, chunk_size, options):
+        codes, unique_keys, representatives = deduplicate_column(texts)
+        counts = np.bincount(codes, minlength=len(unique_keys))
+
+        # The cache is opened on the loop thread, since SQLite connections stay on
+        # the thread that made them.
+        cache = None
+        version = engine_version(engine, options.get('model'))
+        found = {}
+        if self.sentiment_cache is not None:
+            from sentiment_cache import SentimentCache
+            cache = SentimentCache(self.sentiment_cache)
+            found = cache.get_many(unique_keys, engine, version)
+            cache.duplicates += len(codes) - len(unique_keys)
+        missing = [i for i, key in enumerate(unique_keys) if key not in found]
+        job.done = len(codes) - int(counts[missing].sum())
+
+        # Texts are decoded only for the chunks in flight, at most two per worker.
+        chunks = collections.deque(missing[start:start + chunk_size] for start in range(0, len(missing), chunk_size))
+        futures = collections.deque()
+        try:
+            while chunks or futures:
+                while chunks and len(futures) < 2 * self.workers:
+                    chunk = chunks.popleft()
+                    futures.append((chunk, self.loop.run_in_executor(self.executor, _score_batch, engine,
+                                                                     texts.decode(representatives[chunk]), options)))
+                chunk, future = futures.popleft()
+                columns = await future
+                rows = list(zip(*(column.tolist() for column in columns)))
+                for i, row in zip(chunk, rows):
+                    found[unique_keys[i]] = list(row)
+                if cache is not None:
+                    cache.put_many([(unique_keys[i], list(row)) for i, row in zip(chunk, rows)], engine, version)
+                job.done += int(counts[chunk].sum())
+        except asyncio.CancelledError:
+            for _, future in futures:
+                future.cancel()
+            raise
+        finally:
+            if cache is not None:
+                cache.close()
+
+        if len(codes) == 0:
+            return pd.DataFrame(columns=['Text'] + RESULT_COLUMNS[engine])
+        return result_frame(engine, texts, expand(found, unique_keys, codes))
+
+    def cancel(self, job_id):
+        job = self.store.get(job_id)
+        if job.future is None or job.future.done():
+            return False
+        job.future.cancel()
+        return True
+
+    def wait(self, job_id, timeout=None):
+        job = self.store.get(job_id)
+        try:
+            job.future.result(timeout)
+        except Exception:
+            pass
+        # A cancelled future returns at once; the job is marked once its task unwinds.
+        while job.future.cancelled() and job.finished is None:
+            time.sleep(0.01)
+        return job
+
+    def active(self):
+        return [job for job in self.store.jobs.values() if job.status in ('queued', 'running')]
+
+    def shutdown(self):
+        for job in self.active():
+            job.future.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
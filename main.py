@@ -1,30 +1,45 @@
+import importlib
 import sys
-import pandas as pd
-from data_inspection import DataInspection
-from data_analysis1 import DataAnalysis1
-from data_analysis2 import DataAnalysis2
-from sentiment_analysis import SentimentAnalysis
+import threading
+
+# Analysis modules (and pandas, scipy, matplotlib and the sentiment engines
+# behind them) are imported by the menu that needs them, so the first prompt
+# appears immediately.
+def preload(module_name):
+    threading.Thread(target=importlib.import_module, args=(module_name,), daemon=True).start()
 
 def main():
+    # pandas and the loader import in the background while the user types.
+    preload('dataset_cache')
     file_path = input("Please provide the file path to the CSV dataset: ")
+    streaming = input("Use streaming load for large files? (y/n): ").strip().lower() == 'y'
+    from dataset_cache import load_dataset
     try:
-        df = pd.read_csv(file_path)
+        df = load_dataset(file_path, streaming)
+        if streaming:
+            print("Column Summary:")
+            print(df.attrs['column_summary'])
         print(f"Dataset loaded successfully with shape {df.shape}")
     except Exception as e:
         print(f"Error loading dataset: {e}")
         sys.exit(1)
 
+    jobs = None
+    inspection = None
     while True:
         print("\nMain Menu:")
         print("1. Data Inspection")
         print("2. Statistical Analysis 1")
         print("3. Statistical Analysis 2")
         print("4. Sentiment Analysis")
-        print("5. Exit")
-        choice = input("Please select an option (1-5): ")
+        print("5. Incremental Update (appended rows)")
+        print("6. Background Jobs")
+        print("7. Instrumentation")
+        print("8. Exit")
+        choice = input("Please select an option (1-8): ")
 
         if choice == '1':
-            data_inspection_menu(df)
+            inspection = data_inspection_menu(df, inspection)
         elif choice == '2':
             data_analysis1_menu(df)
         elif choice == '3':
@@ -32,14 +47,26 @@ def main():
         elif choice == '4':
             sentiment_analysis_menu(df)
         elif choice == '5':
+            incremental_menu(file_path, df)
+        elif choice == '6':
+            jobs = jobs_menu(df, jobs)
+        elif choice == '7':
+            instrumentation_menu()
+        elif choice == '8':
+            if jobs is not None:
+                jobs.shutdown()
             print("Exiting the program.")
             break
         else:
             print("Invalid choice. Please try again.")
 
-def data_inspection_menu(df):
-    di = DataInspection()
-    di.df = df.copy()
+# The DataInspection (and the FrameView holding its imputations) is kept for the
+# whole session, so later visits reuse the classification instead of redoing it.
+def data_inspection_menu(df, di=None):
+    from data_inspection import DataInspection
+    if di is None:
+        di = DataInspection()
+        di.df = df
     di.classify_columns()
 
     while True:
@@ -50,8 +77,12 @@ def data_inspection_menu(df):
         print("4. Standard Deviation")
         print("5. Kurtosis")
         print("6. Skewness")
-        print("7. Back to Main Menu")
-        choice = input("Please select an option (1-7): ")
+        print("7. Correlation Matrix (all numeric columns)")
+        print("8. Summary Statistics (all numeric columns)")
+        print("9. Column Plot")
+        print("10. Render All Column Plots to a Directory")
+        print("11. Back to Main Menu")
+        choice = input("Please select an option (1-11): ")
 
         if choice == '1':
             numeric_cols = di.numeric_columns()
@@ -111,19 +142,47 @@ def data_inspection_menu(df):
             else:
                 print("Invalid column selected.")
         elif choice == '7':
-            break
+            method = input("Enter the correlation method (pearson/spearman): ").strip().lower()
+            if method in ('pearson', 'spearman'):
+                print(di.correlation_matrix(method))
+            else:
+                print("Invalid method selected.")
+        elif choice == '8':
+            print(di.moment_statistics())
+        elif choice == '9':
+            print(f"Columns: {list(di.plot_plans)}")
+            col = input("Enter the column name: ")
+            if col in di.plot_plans:
+                di.plot_column(col)
+            else:
+                print("Invalid column selected.")
+        elif choice == '10':
+            status = di.render_status()
+            if status['running']:
+                print(f"Previous render still running: {status['done']} done, {status['running']} running, "
+                      f"{len(status['failed'])} failed.")
+                continue
+            for col, error in status['failed'].items():
+                print(f"Previous render of '{col}' failed: {error}")
+            figure_dir = input("Enter the figure directory (press Enter for 'figures'): ").strip() or 'figures'
+            di.render_all_plots(figure_dir)
+            print(f"Rendering {len(di.plot_plans)} plots in the background to '{figure_dir}'.")
+        elif choice == '11':
+            return di
         else:
             print("Invalid choice. Please try again.")
 
 def data_analysis1_menu(df):
+    from data_analysis1 import DataAnalysis1
     da1 = DataAnalysis1(df)
 
     while True:
         print("\nStatistical Analysis 1 Menu:")
         print("1. Normality Test")
         print("2. Hypothesis Test")
-        print("3. Back to Main Menu")
-        choice = input("Please select an option (1-3): ")
+        print("3. Screen all variable pairs")
+        print("4. Back to Main Menu")
+        choice = input("Please select an option (1-4): ")
 
         if choice == '1':
             continuous_var = da1.select_variable('interval')
@@ -136,15 +195,38 @@ def data_analysis1_menu(df):
             skewed = da1.check_skewness(da1.df[continuous_var])
             null_hyp = input("Please enter the null hypothesis: ")
             if categorical_var:
-                da1.hypothesis_test(continuous_var, categorical_var, skewed, null_hyp)
+                resamples, workers = ask_resamples()
+                da1.hypothesis_test(continuous_var, categorical_var, skewed, null_hyp, resamples, workers)
             else:
                 print("No categorical variable selected.")
         elif choice == '3':
+            screen_menu(da1)
+        elif choice == '4':
             break
         else:
             print("Invalid choice. Please try again.")
 
+def screen_menu(analysis):
+    workers = input("Number of worker processes (press Enter for 1): ").strip()
+    results = analysis.screen_all_pairs(workers=int(workers) if workers.isdigit() else 1)
+    sort_by = input(f"Sort by which column? {list(results.columns)} (press Enter to keep Q-value order): ").strip()
+    if sort_by in results.columns:
+        results = results.sort_values(sort_by, ignore_index=True)
+        print(results)
+    path = input("Save the table to CSV (enter a path, or press Enter to skip): ").strip()
+    if path:
+        results.to_csv(path, index=False)
+        print(f"Saved {len(results)} rows to {path}.")
+
+def ask_resamples():
+    resamples = input("Number of resamples for permutation/bootstrap (press Enter to skip): ").strip()
+    if not resamples.isdigit() or int(resamples) == 0:
+        return 0, 1
+    workers = input("Number of worker processes (press Enter for 1): ").strip()
+    return int(resamples), int(workers) if workers.isdigit() else 1
+
 def data_analysis2_menu(df):
+    from data_analysis2 import DataAnalysis2
     da2 = DataAnalysis2(df)
 
     while True:
@@ -152,28 +234,46 @@ def data_analysis2_menu(df):
         print("1. Linear Regression")
         print("2. t-test or Mann-Whitney U Test")
         print("3. Chi-square Test")
-        print("4. Back to Main Menu")
-        choice = input("Please select an option (1-4): ")
+        print("4. Chi-square Test (all nominal pairs)")
+        print("5. Screen all variable pairs")
+        print("6. Back to Main Menu")
+        choice = input("Please select an option (1-6): ")
 
         if choice == '1':
-            x_var = da2.select_variable('interval')
+            count = input("How many predictor variables? (press Enter for 1): ").strip()
+            count = int(count) if count.isdigit() and int(count) > 0 else 1
+            x_vars = [da2.select_variable('interval') for _ in range(count)]
+            print("Select the response variable.")
             y_var = da2.select_variable('interval')
-            da2.perform_regression(x_var, y_var)
+            resamples, workers = ask_resamples()
+            try:
+                da2.perform_regression(x_vars, y_var, workers, resamples)
+            except ValueError as e:
+                print(f"Regression not fitted: {e}")
         elif choice == '2':
             continuous_var = da2.select_variable('interval')
             categorical_var = da2.select_variable('nominal', max_categories=2)
-            da2.t_test_or_mannwhitney(continuous_var, categorical_var)
+            resamples, workers = ask_resamples()
+            da2.t_test_or_mannwhitney(continuous_var, categorical_var, resamples, workers)
         elif choice == '3':
             categorical_var_1 = da2.select_variable('nominal')
             categorical_var_2 = da2.select_variable('nominal')
             da2.chi_square_test(categorical_var_1, categorical_var_2)
         elif choice == '4':
+            workers = input("Number of worker processes (press Enter for 1): ").strip()
+            da2.chi_square_all_pairs(workers=int(workers) if workers.isdigit() else 1)
+        elif choice == '5':
+            screen_menu(da2)
+        elif choice == '6':
             break
         else:
             print("Invalid choice. Please try again.")
 
 def sentiment_analysis_menu(df):
-    sa = SentimentAnalysis(df)
+    from sentiment_analysis import SentimentAnalysis, is_text_column, result_frame
+    from sentiment_cache import SentimentCache
+    from text_column import TextColumn, memory_report, print_memory_report
+    sa = SentimentAnalysis(df, cache=SentimentCache())
     text_columns_df = sa.get_text_columns()
     print("\nText Columns in the Dataset:")
     print(text_columns_df)
@@ -182,9 +282,13 @@ def sentiment_analysis_menu(df):
     if column_name not in df.columns:
         print("Invalid column name.")
         return
-    if df[column_name].dtype != 'object':
+    if not is_text_column(df[column_name]):
         print("Selected column is not a text column.")
         return
+    # The column is encoded once and shared by scoring, the cache lookups and the
+    # result table, instead of copying the texts for each of them.
+    column = TextColumn.from_series(df[column_name])
+    print_memory_report(memory_report(df[column_name], column))
 
     print("\nChoose the type of sentiment analysis:")
     print("1. VADER")
@@ -192,36 +296,271 @@ def sentiment_analysis_menu(df):
     print("3. DistilBERT")
     analysis_type = input("Enter your choice (1-3): ")
 
+    result_df = None
     if analysis_type == '1':
-        scores, sentiments = sa.vader_sentiment_analysis(df[column_name].dropna())
-        result_df = pd.DataFrame({
-            'Text': df[column_name].dropna(),
-            'Score': scores,
-            'Sentiment': sentiments
-        })
-        print(result_df)
+        workers = input("Number of worker processes (press Enter for 1): ").strip()
+        workers = int(workers) if workers.isdigit() else 1
+        result_df = result_frame('vader', column, sa.analyze('vader', column, workers=workers))
     elif analysis_type == '2':
-        scores, sentiments, subjectivity = sa.textblob_sentiment_analysis(df[column_name].dropna())
-        result_df = pd.DataFrame({
-            'Text': df[column_name].dropna(),
-            'Polarity Score': scores,
-            'Sentiment': sentiments,
-            'Subjectivity': subjectivity
-        })
-        print(result_df)
+        workers = input("Number of worker processes (press Enter for 1): ").strip()
+        workers = int(workers) if workers.isdigit() else 1
+        result_df = result_frame('textblob', column, sa.analyze('textblob', column, workers=workers))
     elif analysis_type == '3':
         try:
-            scores, sentiments = sa.distilbert_sentiment_analysis(df[column_name].dropna())
-            result_df = pd.DataFrame({
-                'Text': df[column_name].dropna(),
-                'Score': scores,
-                'Sentiment': sentiments
-            })
-            print(result_df)
+            result_df = result_frame('distilbert', column, sa.analyze('distilbert', column))
         except ImportError as e:
             print("Transformers library is not installed. Please install it to use this feature.")
     else:
         print("Invalid choice. Please choose 1, 2, or 3.")
+    if result_df is not None:
+        print(result_df)
+        print(f"Result table memory: {int(result_df.memory_usage(deep=True).sum()):,} bytes.")
+    sa.cache.report()
+    sa.cache.close()
+
+def incremental_menu(file_path, df):
+    from column_profile import profile_columns
+    from incremental import IncrementalAnalysis
+    ia = IncrementalAnalysis.open(file_path)
+
+    def ask_column(prompt):
+        column = input(prompt)
+        while column not in df.columns:
+            column = input("Invalid column. Please enter a column name: ")
+        return column
+
+    while True:
+        print("\nIncremental Update Menu:")
+        print("1. Process appended rows and show results")
+        print("2. Track ANOVA / Kruskal-Wallis test")
+        print("3. Track Chi-square test")
+        print("4. Track Linear Regression")
+        print("5. Track Sentiment Scores")
+        print("6. Recompute Stale Results")
+        print("7. Clear Stale Results")
+        print("8. Stop Tracking a Test")
+        print("9. Back to Main Menu")
+        choice = input("Please select an option (1-9): ")
+
+        if choice == '1':
+            new_rows = ia.refresh()
+            print(f"Processed {new_rows} rows ({ia.rows} in total).")
+            print("Column Classifications:")
+            for col, dtype in ia.profile().classify(20).items():
+                print(f"{col}: {dtype}")
+            for name, result in ia.results().items():
+                if 'error' in result:
+                    print(f"{name}: not computed ({result['error']})")
+                else:
+                    print(f"{name}: {result}")
+            if ia.stale:
+                print("Needs recomputation on the full dataset (option 6):")
+                for name, reason in ia.stale.items():
+                    print(f"  {name}: {reason}")
+        elif choice == '2':
+            continuous_var = ask_column("Enter the continuous column: ")
+            categorical_var = ask_column("Enter the categorical column: ")
+            skewed = abs(profile_columns(df).stats.at[continuous_var, 'skew']) > 1
+            try:
+                print(f"Tracking {ia.track_group_test(continuous_var, categorical_var, skewed, df)}")
+            except ValueError as e:
+                print(f"Not tracked: {e}")
+        elif choice == '3':
+            categorical_var_1 = ask_column("Enter the first categorical column: ")
+            categorical_var_2 = ask_column("Enter the second categorical column: ")
+            try:
+                print(f"Tracking {ia.track_chi_square(categorical_var_1, categorical_var_2, df)}")
+            except ValueError as e:
+                print(f"Not tracked: {e}")
+        elif choice == '4':
+            x_vars = [col.strip() for col in input("Enter the predictor columns (comma separated): ").split(',')]
+            if not all(col in df.columns for col in x_vars):
+                print("Invalid columns selected.")
+                continue
+            y_var = ask_column("Enter the response column: ")
+            try:
+                print(f"Tracking {ia.track_regression(x_vars, y_var, df)}")
+            except ValueError as e:
+                print(f"Not tracked: {e}")
+        elif choice == '5':
+            column = ask_column("Enter the text column: ")
+            engine = input("Engine (vader/textblob/distilbert, press Enter for vader): ").strip() or 'vader'
+            try:
+                print(f"Tracking {ia.track_sentiment(column, engine, df)}")
+            except ValueError as e:
+                print(f"Not tracked: {e}")
+        elif choice == '6':
+            if not ia.stale:
+                print("Nothing needs recomputation.")
+                continue
+            # The session's frame predates the appended rows, so the file is loaded again.
+            from dataset_cache import load_dataset
+            for name, result in ia.recompute(load_dataset(file_path)).items():
+                if 'error' in result:
+                    print(f"{name}: not recomputed ({result['error']})")
+                else:
+                    print(f"{name}: {result}")
+        elif choice == '7':
+            print(f"Stale: {list(ia.stale)}")
+            name = input("Enter the result to clear (press Enter for all): ").strip()
+            for stale_name in ([name] if name else list(ia.stale)):
+                ia.mark_recomputed(stale_name)
+        elif choice == '8':
+            print(f"Tracked: {ia.tracked()}")
+            name = input("Enter the test to stop tracking: ").strip()
+            try:
+                ia.untrack(name)
+                print(f"Stopped tracking {name}")
+            except KeyError as e:
+                print(e.args[0])
+        elif choice == '9':
+            break
+        else:
+            print("Invalid choice. Please try again.")
+
+# Jobs run in the background; the queue lives for the whole session, so the
+# menu can be left and reopened while jobs run and their results stay available.
+def jobs_menu(df, jobs=None):
+    from job_queue import JobQueue
+    from sentiment_analysis import RESULT_COLUMNS
+    if jobs is None:
+        workers = input("Number of worker processes for background jobs (press Enter for all CPUs): ").strip()
+        jobs = JobQueue(df, int(workers) if workers.isdigit() else None, sentiment_cache='sentiment_cache.sqlite')
+
+    def ask_column(prompt):
+        column = input(prompt)
+        while column not in df.columns:
+            column = input("Invalid column. Please enter a column name: ")
+        return column
+
+    def ask_job():
+        job_id = input("Enter the job number: ").strip()
+        if not job_id.isdigit() or int(job_id) not in jobs.store.jobs:
+            print("No such job.")
+            return None
+        return jobs.store.get(int(job_id))
+
+    while True:
+        print("\nBackground Jobs Menu:")
+        print("1. Submit Sentiment Analysis")
+        print("2. Submit Statistical Test")
+        print("3. Show Jobs and Progress")
+        print("4. View Result")
+        print("5. Cancel Job")
+        print("6. Export Result")
+        print("7. Back to Main Menu")
+        choice = input("Please select an option (1-7): ")
+
+        if choice == '1':
+            column = ask_column("Enter the text column: ")
+            engine = input(f"Engine {list(RESULT_COLUMNS)} (press Enter for vader): ").strip() or 'vader'
+            try:
+                print(f"Submitted job {jobs.submit_sentiment(column, engine)}.")
+            except ValueError as e:
+                print(e)
+        elif choice == '2':
+            print("Tests: normality, hypothesis, regression, t_test, chi_square, chi_square_all_pairs, screen")
+            test_type = input("Enter the test: ").strip()
+            if test_type == 'normality':
+                test = {'type': test_type, 'column': ask_column("Enter the column: ")}
+            elif test_type in ('hypothesis', 't_test'):
+                test = {'type': test_type, 'continuous': ask_column("Enter the continuous column: "),
+                        'categorical': ask_column("Enter the categorical column: ")}
+            elif test_type == 'regression':
+                test = {'type': test_type, 'x': ask_column("Enter the predictor column: "),
+                        'y': ask_column("Enter the response column: ")}
+            elif test_type == 'chi_square':
+                test = {'type': test_type, 'columns': [ask_column("Enter the first categorical column: "),
+                                                       ask_column("Enter the second categorical column: ")]}
+            elif test_type in ('chi_square_all_pairs', 'screen'):
+                test = {'type': test_type}
+            else:
+                print("Unknown test.")
+                continue
+            if test_type in ('hypothesis', 't_test', 'regression'):
+                test['resamples'] = ask_resamples()[0]
+            print(f"Submitted job {jobs.submit_test(test)}.")
+        elif choice == '3':
+            print(jobs.store.table().to_string(index=False))
+        elif choice == '4':
+            job = ask_job()
+            if job is None:
+                continue
+            if job.status == 'failed':
+                print(f"Job {job.id} failed: {job.error}")
+            elif job.status != 'done':
+                print(f"Job {job.id} is {job.status} ({job.done}/{job.total} rows).")
+            else:
+                if job.output:
+                    print(job.output)
+                print(job.result)
+        elif choice == '5':
+            job = ask_job()
+            if job is not None:
+                print(f"Cancelling job {job.id}." if jobs.cancel(job.id) else f"Job {job.id} is already {job.status}.")
+        elif choice == '6':
+            job = ask_job()
+            if job is None:
+                continue
+            path = input("Enter the output path (.csv/.parquet for tables, .json otherwise): ").strip()
+            try:
+                print(f"Saved job {job.id} to {jobs.store.export(job.id, path)}.")
+            except (ValueError, OSError, ImportError) as e:
+                print(f"Could not export: {e}")
+        elif choice == '7':
+            return jobs
+        else:
+            print("Invalid choice. Please try again.")
+
+def instrumentation_menu():
+    import instrumentation
+
+    while True:
+        state = f"on, writing to {instrumentation.trace_path()}" if instrumentation.is_enabled() else "off"
+        print(f"\nInstrumentation Menu (tracing is {state}):")
+        print("1. Enable tracing")
+        print("2. Disable tracing")
+        print("3. Summary of this session")
+        print("4. Summary of a trace file")
+        print("5. Profile of the slowest profiled call")
+        print("6. Back to Main Menu")
+        choice = input("Please select an option (1-6): ")
+
+        if choice == '1':
+            path = input(f"Trace file (press Enter for {instrumentation.DEFAULT_TRACE}): ").strip() or instrumentation.DEFAULT_TRACE
+            mode = input("Capture mode (cprofile/tracemalloc, press Enter for timing only): ").strip().lower() or None
+            try:
+                instrumentation.enable(path, mode)
+            except ValueError as e:
+                print(e)
+        elif choice == '2':
+            instrumentation.disable()
+        elif choice == '3':
+            print(instrumentation.summary())
+        elif choice == '4':
+            path = input(f"Trace file (press Enter for {instrumentation.DEFAULT_TRACE}): ").strip() or instrumentation.DEFAULT_TRACE
+            try:
+                print(instrumentation.summary(path))
+            except (OSError, ValueError) as e:
+                print(f"Error reading trace file: {e}")
+        elif choice == '5':
+            profiled = [record for record in instrumentation.records() if 'profile' in record]
+            if not profiled:
+                print("No profiled calls yet; enable tracing in cprofile mode first.")
+                continue
+            slowest = max(profiled, key=lambda record: record['wall_s'])
+            print(f"{slowest['name']}: {slowest['wall_s']:.3f}s wall")
+            for entry in slowest['profile']:
+                print(f"  {entry['cumulative_s']:9.4f}s cumulative  {entry['total_s']:9.4f}s own  "
+                      f"{entry['calls']:>8} calls  {entry['function']}")
+        elif choice == '6':
+            break
+        else:
+            print("Invalid choice. Please try again.")
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1:
+        from batch_runner import main as batch_main
+        batch_main(sys.argv[1:])
+    else:
+        main()
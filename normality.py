@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+from running_stats import RunningMoments
+
+
+def _finite(values):
+    values = pd.Series(values).to_numpy(dtype=np.float64, na_value=np.nan)
+    return values[np.isfinite(values)]
+
+
+class HistogramSketch:
+    # Fixed-range histogram with many narrow bins; quantiles are read off the
+    # interpolated CDF, so memory depends on the bin count, not the row count.
+    def __init__(self, low, high, bins=2048):
+        if not high > low:
+            high = low + 1.0
+        self.edges = np.linspace(low, high, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+
+    def update(self, values):
+        values = _finite(values)
+        self.counts += np.histogram(np.clip(values, self.edges[0], self.edges[-1]), bins=self.edges)[0]
+        return self
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    def quantiles(self, probs):
+        cdf = np.concatenate(([0.0], np.cumsum(self.counts))) / max(self.counts.sum(), 1)
+        return np.interp(probs, cdf, self.edges)
+
+    def coarse(self, bins=50):
+        factor = max(1, len(self.counts) // bins)
+        usable = (len(self.counts) // factor) * factor
+        return self.counts[:usable].reshape(-1, factor).sum(axis=1), self.edges[:usable + 1:factor]
+
+
+class StratifiedSampler:
+    # Reproducible stratified subsample: values are split into equal-width value
+    # strata, every value gets a seeded random key, and each stratum keeps its
+    # `size` smallest keys. sample() then takes a quota proportional to each
+    # stratum's share of the rows, so the tails stay represented.
+    def __init__(self, low, high, size=2000, strata=20, seed=0):
+        if not high > low:
+            high = low + 1.0
+        self.edges = np.linspace(low, high, strata + 1)
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.counts = np.zeros(strata, dtype=np.int64)
+        self.values = np.empty(0)
+        self.keys = np.empty(0)
+        self.strata = np.empty(0, dtype=np.int64)
+
+    def update(self, values):
+        values = _finite(values)
+        strata = np.clip(np.searchsorted(self.edges, values, side='right') - 1, 0, len(self.counts) - 1)
+        self.counts += np.bincount(strata, minlength=len(self.counts))
+        self._keep(np.concatenate((self.values, values)),
+                   np.concatenate((self.keys, self.rng.random(len(values)))),
+                   np.concatenate((self.strata, strata)))
+        return self
+
+    def _keep(self, values, keys, strata):
+        keep = self._smallest_keys(keys, strata, np.full(len(self.counts), self.size))
+        self.values, self.keys, self.strata = values[keep], keys[keep], strata[keep]
+
+    def _smallest_keys(self, keys, strata, quotas):
+        order = np.lexsort((keys, strata))
+        sorted_strata = strata[order]
+        first = np.searchsorted(sorted_strata, np.arange(len(self.counts)))
+        position = np.arange(len(order)) - first[sorted_strata]
+        return order[position < quotas[sorted_strata]]
+
+    def sample(self):
+        total = self.counts.sum()
+        if total <= self.size:
+            return np.sort(self.values)
+        quotas = np.floor(self.counts / total * self.size).astype(np.int64)
+        return np.sort(self.values[self._smallest_keys(self.keys, self.strata, quotas)])
+
+
+def moment_normality_tests(moments):
+    # D'Agostino-Pearson K^2 and Jarque-Bera from accumulated moments, using the
+    # same formulas as scipy.stats.normaltest and scipy.stats.jarque_bera.
+    n = moments.n
+    results = {}
+    if n < 3 or moments.m2 <= 0:
+        return results
+    g1 = np.sqrt(n) * moments.m3 / moments.m2 ** 1.5
+    b2 = n * moments.m4 / moments.m2 ** 2
+
+    jb = n / 6.0 * (g1 ** 2 + (b2 - 3.0) ** 2 / 4.0)
+    results['Jarque-Bera'] = (jb, stats.chi2.sf(jb, 2))
+
+    if n >= 20:
+        y = g1 * np.sqrt(((n + 1) * (n + 3)) / (6.0 * (n - 2)))
+        beta2 = (3.0 * (n * n + 27 * n - 70) * (n + 1) * (n + 3)) / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9))
+        w2 = -1 + np.sqrt(2 * (beta2 - 1))
+        delta = 1 / np.sqrt(0.5 * np.log(w2))
+        alpha = np.sqrt(2.0 / (w2 - 1))
+        y = 1.0 if y == 0 else y
+        z_skew = delta * np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1))
+
+        expected = 3.0 * (n - 1) / (n + 1)
+        variance = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.) * (n + 3) * (n + 5))
+        x = (b2 - expected) / np.sqrt(variance)
+        sqrt_beta1 = 6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9)) * np.sqrt((6.0 * (n + 3) * (n + 5)) / (n * (n - 2) * (n - 3)))
+        a = 6.0 + 8.0 / sqrt_beta1 * (2.0 / sqrt_beta1 + np.sqrt(1 + 4.0 / (sqrt_beta1 ** 2)))
+        term1 = 1 - 2 / (9.0 * a)
+        denom = 1 + x * np.sqrt(2 / (a - 4.0))
+        term2 = np.sign(denom) * ((1 - 2.0 / a) / np.abs(denom)) ** (1 / 3.0) if denom != 0 else np.nan
+        z_kurt = (term1 - term2) / np.sqrt(2 / (9.0 * a))
+        k2 = z_skew ** 2 + z_kurt ** 2
+        results["D'Agostino-Pearson"] = (k2, stats.chi2.sf(k2, 2))
+    return results
+
+
+class NormalitySketch:
+    # Everything the scalable normality check needs, in bounded memory: moments,
+    # a histogram sketch for the Q-Q plot and a stratified Shapiro-Wilk sample.
+    # The sketch and sampler need the value range, so streamed data takes two
+    # passes: moments first, then sketch_pass() over the same chunks.
+    def __init__(self, sample_size=2000, bins=2048, seed=0):
+        self.sample_size = sample_size
+        self.bins = bins
+        self.seed = seed
+        self.moments = RunningMoments()
+        self.histogram = None
+        self.sampler = None
+
+    @classmethod
+    def from_values(cls, values, sample_size=2000, bins=2048, seed=0):
+        sketch = cls(sample_size, bins, seed)
+        values = _finite(values)
+        sketch.moments.update(values)
+        sketch.sketch_pass([values])
+        return sketch
+
+    @classmethod
+    def from_chunks(cls, chunks, sample_size=2000, bins=2048, seed=0):
+        sketch = cls(sample_size, bins, seed)
+        for chunk in chunks():
+            sketch.moments.update(_finite(chunk))
+        sketch.sketch_pass(chunks())
+        return sketch
+
+    def sketch_pass(self, chunks):
+        low, high = self.moments.min, self.moments.max
+        self.histogram = HistogramSketch(low, high, self.bins)
+        self.sampler = StratifiedSampler(low, high, self.sample_size, seed=self.seed)
+        for chunk in chunks:
+            self.histogram.update(chunk)
+            self.sampler.update(chunk)
+        return self
+
+    def shapiro(self):
+        return stats.shapiro(self.sampler.sample())
+
+    def qq_points(self, points=200):
+        probs = (np.arange(1, points + 1) - 0.5) / points
+        return stats.norm.ppf(probs), self.histogram.quantiles(probs)
+
+
+def normality_test(data, size_limit=2000, scalable=True, seed=0):
+    data = data.dropna()
+    if len(data) <= size_limit:
+        stat, p_value = stats.shapiro(data)
+        return "Shapiro-Wilk Test", stat, p_value, {}
+    if not scalable:
+        stat, p_value = stats.anderson(data, dist='norm')[:2]
+        return "Anderson-Darling Test", stat, p_value, {}
+    sketch = NormalitySketch.from_values(data, sample_size=size_limit, seed=seed)
+    stat, p_value = sketch.shapiro()
+    return f"Shapiro-Wilk Test (stratified sample of {size_limit})", stat, p_value, moment_normality_tests(sketch.moments)
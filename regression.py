@@ -0,0 +1,203 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+def _design(df, x_vars, y_var):
+    columns = df[list(x_vars) + [y_var]]
+    non_numeric = [col for col in columns if not pd.api.types.is_numeric_dtype(columns[col])]
+    if non_numeric:
+        raise ValueError(f"Regression needs numeric columns: {non_numeric}.")
+    values = columns.to_numpy(dtype=np.float64, na_value=np.nan)
+    # Rows are kept only when every predictor and the response are present, so X
+    # and y always stay paired row by row.
+    values = values[~np.isnan(values).any(axis=1)]
+    return values[:, :-1], values[:, -1]
+
+
+class RegressionAccumulator:
+    # Ordinary least squares from accumulated cross-products X'X, X'y and y'y.
+    # Chunks can be added one at a time or fitted in separate workers and merged.
+    # Values are shifted by a fixed centre before accumulating to keep the
+    # cross-products well conditioned; fit() maps the results back.
+    def __init__(self, x_vars, y_var, centre=None):
+        check_predictor_names(x_vars, y_var)
+        self.x_vars = list(x_vars)
+        self.y_var = y_var
+        self.centre = None if centre is None else np.asarray(centre, dtype=np.float64)
+        size = len(self.x_vars) + 1
+        self.n = 0
+        self.xtx = np.zeros((size, size))
+        self.xty = np.zeros(size)
+        self.yty = 0.0
+
+    def update_frame(self, df):
+        return self.update(*_design(df, self.x_vars, self.y_var))
+
+    def update(self, X, y):
+        if len(y) == 0:
+            return self
+        if self.centre is None:
+            self.centre = np.concatenate((X.mean(axis=0), [y.mean()]))
+        design = np.column_stack((np.ones(len(y)), X - self.centre[:-1]))
+        y = y - self.centre[-1]
+        self.n += len(y)
+        self.xtx += design.T @ design
+        self.xty += design.T @ y
+        self.yty += y @ y
+        return self
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.centre = other.centre
+            self.n, self.xtx, self.xty, self.yty = other.n, other.xtx.copy(), other.xty.copy(), other.yty
+            return self
+        # Re-express the other accumulator's sums around this one's centre.
+        shift = np.concatenate(([0.0], other.centre[:-1] - self.centre[:-1]))
+        y_shift = other.centre[-1] - self.centre[-1]
+        T = np.eye(len(shift))
+        T[1:, 0] = shift[1:]
+        xtx = T @ other.xtx @ T.T
+        xty = T @ (other.xty + y_shift * other.xtx[:, 0])
+        yty = other.yty + 2 * y_shift * other.xty[0] + y_shift ** 2 * other.n
+        self.n += other.n
+        self.xtx += xtx
+        self.xty += xty
+        self.yty += yty
+        return self
+
+    def fit(self):
+        return RegressionResult(self)
+
+
+class RegressionResult:
+    def __init__(self, acc):
+        k = len(acc.x_vars)
+        self.n = acc.n
+        self.df_resid = acc.n - k - 1
+        # A singular X'X (collinear or constant predictors, or too few rows) has no
+        # unique solution, so it is reported instead of being solved.
+        diagonal = np.diag(acc.xtx)
+        if acc.n < k + 1:
+            raise ValueError(f"Regression of '{acc.y_var}' on {acc.x_vars} needs at least {k + 1} complete rows, "
+                             f"found {acc.n}.")
+        # n * variance of each predictor, from the (centred) sums in X'X.
+        spread = diagonal[1:] - acc.xtx[0, 1:] ** 2 / acc.n
+        constant = [col for col, value, total in zip(acc.x_vars, spread, diagonal[1:]) if value <= 1e-12 * total]
+        if constant:
+            raise ValueError(f"Constant predictors cannot be fitted: {constant}.")
+        # The rank is taken on X'X scaled to unit diagonal, so predictors on very
+        # different scales are not mistaken for collinear ones.
+        rank = 0
+        if np.all(diagonal > 0):
+            scale = 1.0 / np.sqrt(diagonal)
+            rank = np.linalg.matrix_rank(acc.xtx * scale[:, None] * scale[None, :])
+        if rank < k + 1:
+            raise ValueError(f"Regression of '{acc.y_var}' on {acc.x_vars} is rank deficient (rank {rank} of {k + 1}): "
+                             f"the predictors are collinear or constant, or there are too few complete rows.")
+        try:
+            beta = np.linalg.solve(acc.xtx, acc.xty)
+            inverse = np.linalg.inv(acc.xtx)
+        except np.linalg.LinAlgError as e:
+            raise ValueError(f"Regression of '{acc.y_var}' on {acc.x_vars} could not be solved: {e}")
+
+        ss_resid = max(acc.yty - beta @ acc.xty, 0.0)
+        y_mean = acc.xty[0] / acc.n
+        ss_total = acc.yty - acc.n * y_mean ** 2
+        self.r_squared = 1.0 - ss_resid / ss_total if ss_total > 0 else np.nan
+        self.adj_r_squared = 1.0 - (1.0 - self.r_squared) * (acc.n - 1) / self.df_resid if self.df_resid > 0 else np.nan
+        sigma2 = ss_resid / self.df_resid if self.df_resid > 0 else np.nan
+
+        # Undo the centring: intercept = a + y_centre - b . x_centre.
+        T = np.eye(k + 1)
+        T[0, 1:] = -acc.centre[:-1]
+        params = T @ beta
+        params[0] += acc.centre[-1]
+        covariance = sigma2 * (T @ inverse @ T.T)
+
+        names = ['Intercept'] + acc.x_vars
+        self.coefficients = pd.Series(params, index=names)
+        self.std_errors = pd.Series(np.sqrt(np.diag(covariance)), index=names)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.t_values = self.coefficients / self.std_errors
+        self.p_values = pd.Series(2 * stats.t.sf(np.abs(self.t_values), self.df_resid), index=names)
+        if k > 0 and self.df_resid > 0 and ss_total > 0:
+            self.f_stat = ((ss_total - ss_resid) / k) / sigma2
+            self.f_p_value = stats.f.sf(self.f_stat, k, self.df_resid)
+        else:
+            self.f_stat = self.f_p_value = np.nan
+
+    @property
+    def intercept(self):
+        return self.coefficients['Intercept']
+
+    def summary(self):
+        return pd.DataFrame({
+            'Coefficient': self.coefficients,
+            'Std. Error': self.std_errors,
+            't': self.t_values,
+            'P-value': self.p_values,
+        })
+
+    def as_dict(self):
+        return {
+            'n': self.n,
+            'r_squared': self.r_squared,
+            'adj_r_squared': self.adj_r_squared,
+            'f_stat': self.f_stat,
+            'f_p_value': self.f_p_value,
+            'coefficients': self.summary().to_dict(orient='index'),
+        }
+
+
+def _fit_part(X, y, x_vars, y_var, centre):
+    return RegressionAccumulator(x_vars, y_var, centre).update(X, y)
+
+
+def check_predictor_names(x_vars, y_var):
+    if len(set(x_vars)) < len(x_vars):
+        raise ValueError(f"Each predictor can only be used once: {list(x_vars)}.")
+    if y_var in x_vars:
+        raise ValueError(f"The response '{y_var}' cannot also be a predictor.")
+
+
+# Checks that need the data as well as the names; accumulators fitted from chunks
+# (fit_csv, incremental updates) find constant predictors from their sums instead.
+def check_predictors(df, x_vars, y_var):
+    check_predictor_names(x_vars, y_var)
+    missing = [col for col in list(x_vars) + [y_var] if col not in df.columns]
+    if missing:
+        raise ValueError(f"Columns not found: {missing}.")
+    non_numeric = [col for col in list(x_vars) + [y_var] if not pd.api.types.is_numeric_dtype(df[col])]
+    if non_numeric:
+        raise ValueError(f"Regression needs numeric columns: {non_numeric}.")
+    constant = [col for col in x_vars if df[col].nunique() < 2]
+    if constant:
+        raise ValueError(f"Constant predictors cannot be fitted: {constant}.")
+
+
+def fit_frame(df, x_vars, y_var, workers=1, chunk_size=1000000):
+    check_predictors(df, x_vars, y_var)
+    X, y = _design(df, x_vars, y_var)
+    acc = RegressionAccumulator(x_vars, y_var)
+    if workers <= 1 or len(y) <= chunk_size:
+        return acc.update(X, y).fit()
+    centre = np.concatenate((X[:chunk_size].mean(axis=0), [y[:chunk_size].mean()]))
+    acc.centre = centre
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_fit_part, X[start:start + chunk_size], y[start:start + chunk_size], x_vars, y_var, centre)
+                   for start in range(0, len(y), chunk_size)]
+        for future in futures:
+            acc.merge(future.result())
+    return acc.fit()
+
+
+def fit_csv(file_path, x_vars, y_var, chunksize=100000):
+    x_vars = list(x_vars)
+    acc = RegressionAccumulator(x_vars, y_var)
+    for chunk in pd.read_csv(file_path, usecols=list(x_vars) + [y_var], chunksize=chunksize):
+        acc.update_frame(chunk)
+    return acc.fit()
@@ -0,0 +1,362 @@
+import numpy as np
+import pandas as pd
+
+
+class RunningMoments:
+    # Mergeable count/mean/central moments (Chan et al. / Pebay update rules),
+    # so statistics can be accumulated chunk by chunk or merged across workers.
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.min = np.nan
+        self.max = np.nan
+
+    @classmethod
+    def from_values(cls, values):
+        moments = cls()
+        moments.update(values)
+        return moments
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        other = RunningMoments()
+        other.n = len(values)
+        other.mean = values.mean()
+        delta = values - other.mean
+        delta2 = delta * delta
+        other.m2 = delta2.sum()
+        other.m3 = (delta2 * delta).sum()
+        other.m4 = (delta2 * delta2).sum()
+        other.min = values.min()
+        other.max = values.max()
+        return self.merge(other)
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean = other.n, other.mean
+            self.m2, self.m3, self.m4 = other.m2, other.m3, other.m4
+            self.min, self.max = other.min, other.max
+            return self
+
+        n_a, n_b = self.n, other.n
+        n = n_a + n_b
+        delta = other.mean - self.mean
+        delta2 = delta * delta
+        m2 = self.m2 + other.m2 + delta2 * n_a * n_b / n
+        m3 = (self.m3 + other.m3
+              + delta2 * delta * n_a * n_b * (n_a - n_b) / (n * n)
+              + 3.0 * delta * (n_a * other.m2 - n_b * self.m2) / n)
+        m4 = (self.m4 + other.m4
+              + delta2 * delta2 * n_a * n_b * (n_a * n_a - n_a * n_b + n_b * n_b) / (n ** 3)
+              + 6.0 * delta2 * (n_a * n_a * other.m2 + n_b * n_b * self.m2) / (n * n)
+              + 4.0 * delta * (n_a * other.m3 - n_b * self.m3) / n)
+
+        self.mean = self.mean + delta * n_b / n
+        self.m2, self.m3, self.m4 = m2, m3, m4
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def variance(self):
+        if self.n < 2:
+            return np.nan
+        return self.m2 / (self.n - 1)
+
+    def std(self):
+        return np.sqrt(self.variance())
+
+    def skew(self):
+        return float(sample_skew(self.n, self.m2, self.m3))
+
+    def kurt(self):
+        return float(sample_kurt(self.n, self.m2, self.m4))
+
+
+# Bias-corrected skewness and excess kurtosis from central moment sums, matching
+# pandas' skew()/kurt(). Both accept scalars or per-column arrays.
+def sample_skew(n, m2, m3):
+    n, m2, m3 = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (n, m2, m3)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        g1 = np.sqrt(n) * m3 / m2 ** 1.5
+        result = np.sqrt(n * (n - 1)) / (n - 2) * g1
+    result = np.where(m2 <= 0, 0.0, result)
+    return np.where(n < 3, np.nan, result)
+
+
+def sample_kurt(n, m2, m4):
+    n, m2, m4 = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (n, m2, m4)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        g2 = n * m4 / (m2 * m2) - 3.0
+        result = ((n + 1) * g2 + 6.0) * (n - 1) / ((n - 2) * (n - 3))
+    result = np.where(m2 <= 0, 0.0, result)
+    return np.where(n < 4, np.nan, result)
+
+
+# NaN-aware count/mean/central moment sums for every column of a 2-D array in
+# one vectorized pass.
+def column_moments(values):
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    n = valid.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(valid, values, 0.0).sum(axis=0) / n
+    delta = np.where(valid, values - mean, 0.0)
+    delta2 = delta * delta
+    m2 = delta2.sum(axis=0)
+    m3 = (delta2 * delta).sum(axis=0)
+    m4 = (delta2 * delta2).sum(axis=0)
+    return n, mean, m2, m3, m4
+
+
+def rank_columns(values):
+    values = np.asarray(values, dtype=np.float64)
+    ranks = np.full(values.shape, np.nan)
+    for j in range(values.shape[1]):
+        column = values[:, j]
+        valid = ~np.isnan(column)
+        ranks[valid, j] = _average_ranks(column[valid])
+    return ranks
+
+
+def _average_ranks(values):
+    order = np.argsort(values, kind='mergesort')
+    sorted_values = values[order]
+    starts = np.concatenate(([True], sorted_values[1:] != sorted_values[:-1]))
+    group = np.cumsum(starts) - 1
+    first = np.flatnonzero(starts)
+    last = np.concatenate((first[1:], [len(values)])) - 1
+    ranks = np.empty(len(values))
+    ranks[order] = (first[group] + last[group]) / 2.0 + 1.0
+    return ranks
+
+
+# Values per row chunk of a column block in pairwise_correlation.
+CHUNK_ELEMENTS = 1 << 20
+
+
+def _column_centres(values, chunk_rows):
+    totals = np.zeros(values.shape[1])
+    counts = np.zeros(values.shape[1])
+    for start in range(0, len(values), chunk_rows):
+        chunk = values[start:start + chunk_rows]
+        totals += np.nansum(chunk, axis=0)
+        counts += (~np.isnan(chunk)).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, totals / counts, 0.0)
+
+
+def _centred_block(values, rows, columns, centre):
+    block = values[rows, columns]
+    valid = ~np.isnan(block)
+    return valid.astype(np.float64), np.where(valid, block - centre[columns], 0.0)
+
+
+# Pearson correlation for every pair of columns using pairwise-complete rows, as
+# pandas' DataFrame.corr() does. Columns are processed in blocks and rows in
+# chunks, so masks, centred values and squares exist only for one chunk of one
+# block pair at a time, never for the whole matrix.
+def pairwise_correlation(values, block_size=512):
+    values = np.asarray(values, dtype=np.float64)
+    rows, k = values.shape
+    centre = _column_centres(values, max(1, CHUNK_ELEMENTS // max(k, 1)))
+    chunk_rows = max(1, CHUNK_ELEMENTS // min(block_size, max(k, 1)))
+    result = np.empty((k, k))
+
+    for i in range(0, k, block_size):
+        a = slice(i, min(i + block_size, k))
+        for j in range(i, k, block_size):
+            b = slice(j, min(j + block_size, k))
+            shape = (a.stop - a.start, b.stop - b.start)
+            n, sx, sy, sxx, syy, sxy = (np.zeros(shape) for _ in range(6))
+            for start in range(0, rows, chunk_rows):
+                chunk = slice(start, start + chunk_rows)
+                valid_a, centred_a = _centred_block(values, chunk, a, centre)
+                valid_b, centred_b = (valid_a, centred_a) if i == j else _centred_block(values, chunk, b, centre)
+                n += valid_a.T @ valid_b
+                sx += centred_a.T @ valid_b
+                sy += valid_a.T @ centred_b
+                sxx += (centred_a * centred_a).T @ valid_b
+                syy += valid_a.T @ (centred_b * centred_b)
+                sxy += centred_a.T @ centred_b
+            with np.errstate(invalid='ignore', divide='ignore'):
+                cov = sxy - sx * sy / n
+                var_x = sxx - sx * sx / n
+                var_y = syy - sy * sy / n
+                corr = cov / np.sqrt(var_x * var_y)
+            corr = np.where(n > 1, np.clip(corr, -1.0, 1.0), np.nan)
+            result[a, b] = corr
+            result[b, a] = corr.T
+    return result
+
+
+def _valid_pairs(values, groups):
+    values = pd.Series(values).to_numpy(dtype=np.float64, na_value=np.nan)
+    groups = pd.Series(groups)
+    valid = ~np.isnan(values) & groups.notna().to_numpy()
+    return values[valid], groups[valid].to_numpy()
+
+
+class GroupMoments:
+    # Per-group count, mean and sum of squared deviations (M2), computed with
+    # bincount in one pass and mergeable across chunks or workers. Keeping M2
+    # rather than a raw sum of squares avoids cancellation on large values.
+    def __init__(self):
+        self.table = pd.DataFrame({'n': [], 'mean': [], 'm2': []}, dtype=np.float64)
+
+    @classmethod
+    def from_values(cls, values, groups):
+        moments = cls()
+        moments.update(values, groups)
+        return moments
+
+    def update(self, values, groups):
+        values, groups = _valid_pairs(values, groups)
+        if len(values) == 0:
+            return self
+        codes, labels = pd.factorize(groups)
+        n = np.bincount(codes, minlength=len(labels)).astype(np.float64)
+        mean = np.bincount(codes, weights=values, minlength=len(labels)) / n
+        delta = values - mean[codes]
+        m2 = np.bincount(codes, weights=delta * delta, minlength=len(labels))
+        other = GroupMoments()
+        other.table = pd.DataFrame({'n': n, 'mean': mean, 'm2': m2}, index=labels)
+        return self.merge(other)
+
+    def merge(self, other):
+        if self.table.empty:
+            self.table = other.table.copy()
+            return self
+        a, b = self.table.align(other.table, join='outer', fill_value=0.0)
+        n = a['n'] + b['n']
+        delta = b['mean'] - a['mean']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(n > 0, a['mean'] + delta * b['n'] / n, 0.0)
+            m2 = a['m2'] + b['m2'] + np.where(n > 0, delta * delta * a['n'] * b['n'] / n, 0.0)
+        self.table = pd.DataFrame({'n': n, 'mean': mean, 'm2': m2}, index=a.index)
+        return self
+
+    def anova(self):
+        table = self.table[self.table['n'] > 0]
+        k = len(table)
+        total = table['n'].sum()
+        grand_mean = (table['n'] * table['mean']).sum() / total
+        ss_between = (table['n'] * (table['mean'] - grand_mean) ** 2).sum()
+        ss_within = table['m2'].sum()
+        df_between, df_within = k - 1, total - k
+        with np.errstate(invalid='ignore', divide='ignore'):
+            f_stat = (ss_between / df_between) / (ss_within / df_within)
+        from scipy import stats
+        return f_stat, stats.f.sf(f_stat, df_between, df_within)
+
+
+class GroupRankSums:
+    # Counts of each (value, group) pair that occurs, kept sparse. These merge by
+    # addition, and one pass over the sorted distinct values yields the average
+    # ranks, per-group rank sums and tie correction of the Kruskal-Wallis test.
+    def __init__(self):
+        self.counts = pd.Series(dtype=np.float64)
+
+    @classmethod
+    def from_values(cls, values, groups):
+        ranks = cls()
+        ranks.update(values, groups)
+        return ranks
+
+    def update(self, values, groups):
+        values, groups = _valid_pairs(values, groups)
+        value_codes, distinct = pd.factorize(values)
+        group_codes, labels = pd.factorize(groups)
+        pairs, counts = np.unique(value_codes.astype(np.int64) * len(labels) + group_codes, return_counts=True)
+        index = pd.MultiIndex.from_arrays([distinct[pairs // len(labels)], labels[pairs % len(labels)]])
+        return self.merge_counts(pd.Series(counts.astype(np.float64), index=index))
+
+    def merge(self, other):
+        return self.merge_counts(other.counts)
+
+    def merge_counts(self, counts):
+        self.counts = counts if self.counts.empty else self.counts.add(counts, fill_value=0.0)
+        return self
+
+    def kruskal(self):
+        counts = self.counts.to_numpy()
+        value_codes, distinct = pd.factorize(self.counts.index.get_level_values(0), sort=True)
+        group_codes, labels = pd.factorize(self.counts.index.get_level_values(1))
+        ties = np.bincount(value_codes, weights=counts, minlength=len(distinct))
+        total = ties.sum()
+        average_rank = np.cumsum(ties) - ties + (ties + 1.0) / 2.0
+        rank_sums = np.bincount(group_codes, weights=average_rank[value_codes] * counts, minlength=len(labels))
+        group_sizes = np.bincount(group_codes, weights=counts, minlength=len(labels))
+        h = 12.0 / (total * (total + 1.0)) * np.sum(rank_sums ** 2 / group_sizes) - 3.0 * (total + 1.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            h /= 1.0 - np.sum(ties ** 3 - ties) / (total ** 3 - total)
+        from scipy import stats
+        return h, stats.chi2.sf(h, len(group_sizes) - 1)
+
+
+class DistinctCounter:
+    # Distinct values counted from their 64-bit hashes: exactly while there are
+    # at most max_exact of them, then with a HyperLogLog sketch of
+    # 2 ** precision one-byte registers (about 1% relative error at the default
+    # precision), so memory and the work per chunk stay bounded on any column.
+    def __init__(self, max_exact=100000, precision=14):
+        self.max_exact = max_exact
+        self.precision = precision
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.registers = None
+
+    @property
+    def exact(self):
+        return self.registers is None
+
+    def update(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if self.registers is not None:
+            self._add(hashes)
+            return self
+        self.hashes = np.union1d(self.hashes, hashes)
+        if len(self.hashes) > self.max_exact:
+            self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+            self._add(self.hashes)
+            self.hashes = None
+        return self
+
+    def merge(self, other):
+        if other.registers is None:
+            return self.update(other.hashes)
+        if self.registers is None:
+            hashes = self.hashes
+            self.registers, self.hashes = other.registers.copy(), None
+            self._add(hashes)
+        else:
+            np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def _add(self, hashes):
+        # The top bits pick a register; it keeps the largest position of the
+        # first set bit seen in the remaining bits.
+        rest_bits = 64 - self.precision
+        index = (hashes >> np.uint64(rest_bits)).astype(np.intp)
+        rest = (hashes & np.uint64((1 << rest_bits) - 1)).astype(np.float64)
+        _, exponent = np.frexp(rest)
+        rank = np.where(rest > 0, rest_bits - exponent + 1, rest_bits + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def count(self):
+        if self.registers is None:
+            return len(self.hashes)
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        empty = np.count_nonzero(self.registers == 0)
+        # Linear counting is more accurate while many registers are still empty.
+        if estimate <= 2.5 * m and empty > 0:
+            estimate = m * np.log(m / empty)
+        return int(round(estimate))
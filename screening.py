@@ -0,0 +1,191 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+import numpy as np
+import pandas as pd
+from scipy import stats
+from column_profile import profile_columns
+from contingency import ContingencyCounts, encode
+
+RESULT_COLUMNS = ['Variable 1', 'Variable 2', 'Test', 'Statistic', 'P-value', 'N']
+
+
+def screening_roles(df, column_types, max_levels=20):
+    # 'interval' columns are continuous; any other column with few enough distinct
+    # values is a grouping variable. Free text and IDs fall out on max_levels.
+    profile = profile_columns(df)
+    continuous = [col for col, dtype in column_types.items() if dtype == 'interval']
+    categorical = [col for col, dtype in column_types.items()
+                   if dtype != 'interval' and 2 <= profile.nunique(col) <= max_levels]
+    return continuous, categorical
+
+
+def _tie_sum(ranks):
+    # sum(t^3 - t) over tied groups, shared by the Kruskal-Wallis and Mann-Whitney
+    # tie corrections.
+    counts = np.unique(ranks, return_counts=True)[1].astype(np.float64)
+    return (counts ** 3 - counts).sum()
+
+
+def _prepare_continuous(series, skewed):
+    values = pd.Series(series).to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = ~np.isnan(values)
+    ranks = np.full(len(values), np.nan)
+    ranks[valid] = stats.rankdata(values[valid])
+    return {'values': values, 'valid': valid, 'skewed': skewed, 'ranks': ranks, 'tie_sum': _tie_sum(ranks[valid])}
+
+
+def _prepare_categorical(series):
+    codes, labels = encode(series)
+    return {'codes': codes, 'labels': labels}
+
+
+def _ranks_for(column, valid):
+    # The column's global ranks are reused whenever the pair drops no extra rows;
+    # otherwise the surviving rows are re-ranked.
+    if np.array_equal(valid, column['valid']):
+        return column['ranks'][valid], column['tie_sum']
+    ranks = stats.rankdata(column['values'][valid])
+    return ranks, _tie_sum(ranks)
+
+
+def _group_test(column, codes, k):
+    valid = column['valid'] & (codes >= 0)
+    codes = codes[valid]
+    counts = np.bincount(codes, minlength=k)
+    present = counts > 0
+    groups = int(present.sum())
+    n = int(valid.sum())
+    if groups < 2 or n <= groups:
+        return None
+    counts = counts[present].astype(np.float64)
+
+    if column['skewed']:
+        ranks, tie_sum = _ranks_for(column, valid)
+        rank_sums = np.bincount(codes, weights=ranks, minlength=k)[present]
+        if groups == 2:
+            n1, n2 = counts
+            u = rank_sums[0] - n1 * (n1 + 1) / 2.0
+            sigma = np.sqrt(n1 * n2 / 12.0 * ((n + 1) - tie_sum / (n * (n - 1))))
+            if sigma == 0:
+                return None
+            z = (abs(u - n1 * n2 / 2.0) - 0.5) / sigma
+            return "Mann-Whitney U Test", u, min(1.0, 2 * stats.norm.sf(z)), n
+        h = 12.0 / (n * (n + 1)) * (rank_sums ** 2 / counts).sum() - 3 * (n + 1)
+        correction = 1.0 - tie_sum / (n ** 3 - n)
+        if correction == 0:
+            return None
+        h /= correction
+        return "Kruskal-Wallis Test", h, stats.chi2.sf(h, groups - 1), n
+
+    values = column['values'][valid]
+    sums = np.bincount(codes, weights=values, minlength=k)[present]
+    squares = np.bincount(codes, weights=values * values, minlength=k)[present]
+    means = sums / counts
+    ss_within = (squares - sums * means).sum()
+    if ss_within <= 0:
+        return None
+    if groups == 2:
+        df_resid = n - 2
+        t = (means[0] - means[1]) / np.sqrt(ss_within / df_resid * (1 / counts[0] + 1 / counts[1]))
+        return "t-test", t, 2 * stats.t.sf(abs(t), df_resid), n
+    grand = sums.sum() / n
+    ss_between = (counts * (means - grand) ** 2).sum()
+    f = (ss_between / (groups - 1)) / (ss_within / (n - groups))
+    return "ANOVA", f, stats.f.sf(f, groups - 1, n - groups), n
+
+
+def _correlation_test(a, b):
+    valid = a['valid'] & b['valid']
+    n = int(valid.sum())
+    if n < 3:
+        return None
+    if a['skewed'] or b['skewed']:
+        x, y = _ranks_for(a, valid)[0], _ranks_for(b, valid)[0]
+        test_name = "Spearman correlation"
+    else:
+        x, y = a['values'][valid], b['values'][valid]
+        test_name = "Pearson correlation"
+    x = x - x.mean()
+    y = y - y.mean()
+    denominator = np.sqrt((x @ x) * (y @ y))
+    if denominator == 0:
+        return None
+    r = float(np.clip((x @ y) / denominator, -1.0, 1.0))
+    with np.errstate(divide='ignore'):
+        t = r * np.sqrt((n - 2) / (1.0 - r * r)) if abs(r) < 1 else np.inf
+    return test_name, r, 2 * stats.t.sf(abs(t), n - 2), n
+
+
+def _chi_square_test(a, b):
+    table = ContingencyCounts.from_codes(a['codes'], b['codes'], a['labels'], b['labels'])
+    chi2, p_value, dof = table.chi2()
+    if dof == 0:
+        return None
+    return "Chi-square Test", chi2, p_value, int(table.counts.sum())
+
+
+_shared_columns = None
+
+
+def _init_columns(columns):
+    global _shared_columns
+    _shared_columns = columns
+
+
+def _screen_pair(task):
+    kind, first, second = task
+    a, b = _shared_columns[first], _shared_columns[second]
+    if kind == 'correlation':
+        result = _correlation_test(a, b)
+    elif kind == 'group':
+        result = _group_test(a, b['codes'], len(b['labels']))
+    else:
+        result = _chi_square_test(a, b)
+    if result is None:
+        return None
+    test_name, stat, p_value, n = result
+    return first, second, test_name, float(stat), float(p_value), n
+
+
+def fdr_correction(p_values):
+    # Benjamini-Hochberg adjusted p-values (q-values); NaNs are left out of the
+    # family and stay NaN.
+    p_values = np.asarray(p_values, dtype=np.float64)
+    q_values = np.full(len(p_values), np.nan)
+    tested = np.flatnonzero(~np.isnan(p_values))
+    if len(tested) == 0:
+        return q_values
+    order = tested[np.argsort(p_values[tested])]
+    scaled = p_values[order] * len(tested) / np.arange(1, len(tested) + 1)
+    q_values[order] = np.minimum(np.minimum.accumulate(scaled[::-1])[::-1], 1.0)
+    return q_values
+
+
+def screen_pairs(df, column_types, max_levels=20, alpha=0.05, workers=1):
+    # Every eligible pair gets one test: correlation for two continuous columns,
+    # t-test/Mann-Whitney or ANOVA/Kruskal-Wallis for continuous by group, and
+    # chi-square for two grouping columns. Skewness (|skew| > 1) picks the
+    # rank-based variants. Ranks and group codes are computed once per column
+    # and shipped to each worker once through the pool initializer.
+    continuous, categorical = screening_roles(df, column_types, max_levels)
+    profile = profile_columns(df)
+    columns = {}
+    for col in continuous:
+        columns[col] = _prepare_continuous(df[col], bool(abs(profile.stats.at[col, 'skew']) > 1))
+    for col in categorical:
+        columns[col] = _prepare_categorical(df[col])
+
+    tasks = ([('correlation', a, b) for a, b in combinations(continuous, 2)]
+             + [('group', a, b) for a in continuous for b in categorical]
+             + [('chi_square', a, b) for a, b in combinations(categorical, 2)])
+    if workers <= 1:
+        _init_columns(columns)
+        results = [_screen_pair(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_columns, initargs=(columns,)) as executor:
+            results = list(executor.map(_screen_pair, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+    table = pd.DataFrame([result for result in results if result is not None], columns=RESULT_COLUMNS)
+    table['Q-value'] = fdr_correction(table['P-value'])
+    table['Significant'] = table['Q-value'] <= alpha
+    return table.sort_values(['Q-value', 'P-value'], ignore_index=True)
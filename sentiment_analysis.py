@@ -1,91 +1,242 @@
+import os
+from importlib import metadata
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from textblob import TextBlob
-
-try:
-    from transformers import pipeline
-except ImportError:
-    pipeline = None
-
+from instrumentation import instrument_class, instrumented
+from sentiment_cache import text_key
+from text_column import TextColumn
+
+# The engines' libraries (vaderSentiment, textblob, transformers) are imported on
+# first use, so importing this module stays cheap.
+DISTILBERT_MODEL = 'nlptown/bert-base-multilingual-uncased-sentiment'
+
+_vader_analyzer = None
+_textblob_analyzer = None
+_sentiment_pipelines = {}
+
+def _vader_scores(texts):
+    global _vader_analyzer
+    if _vader_analyzer is None:
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        _vader_analyzer = SentimentIntensityAnalyzer()
+    return np.fromiter((_vader_analyzer.polarity_scores(text)['compound'] for text in texts),
+                       dtype=np.float64, count=len(texts))
+
+# TextBlob(text).sentiment is PatternAnalyzer().analyze(text); calling the analyzer
+# directly gives polarity and subjectivity from one pass without building a blob.
+def _textblob_scores(texts):
+    global _textblob_analyzer
+    if _textblob_analyzer is None:
+        from textblob.en.sentiments import PatternAnalyzer
+        _textblob_analyzer = PatternAnalyzer()
+    scores = np.empty((len(texts), 2), dtype=np.float64)
+    for i, text in enumerate(texts):
+        polarity, subjectivity = _textblob_analyzer.analyze(text)
+        scores[i] = polarity, subjectivity
+    return scores
+
+# Each scored batch is its own trace record; forked pool workers inherit the
+# setting and append to the same trace file under their own pid.
+_vader_scores = instrumented(_vader_scores, 'sentiment_batch.vader')
+_textblob_scores = instrumented(_textblob_scores, 'sentiment_batch.textblob')
+
+def _chunks(values, chunk_size):
+    return [values[start:start + chunk_size] for start in range(0, len(values), chunk_size)]
+
+def _score_chunks(score, texts, workers, chunk_size):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(texts) <= chunk_size:
+        return score(texts)
+    # Executor.map yields chunk results in submission order, so the scores stay
+    # aligned with the input.
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return np.concatenate(list(executor.map(score, _chunks(texts, chunk_size))))
+
+def _package_version(name):
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return 'unknown'
+
+def engine_version(engine, model=None):
+    if engine == 'vader':
+        return _package_version('vaderSentiment')
+    if engine == 'textblob':
+        return _package_version('textblob')
+    if model is None:
+        model = DISTILBERT_MODEL
+    if not isinstance(model, str):
+        model = type(model).__name__
+    return f"{model}@{_package_version('transformers')}"
+
+# Pipelines are built once per process and model; passing a callable instead of a
+# model name (e.g. a stub or a local tiny model's pipeline) bypasses transformers.
+def get_sentiment_pipeline(model=None):
+    if model is None:
+        model = DISTILBERT_MODEL
+    if callable(model):
+        return model
+    if model not in _sentiment_pipelines:
+        try:
+            from transformers import pipeline
+        except ImportError:
+            raise ImportError("Transformers library is not installed.")
+        _sentiment_pipelines[model] = pipeline('sentiment-analysis', model=model)
+    return _sentiment_pipelines[model]
+
+def _distilbert_sentiment(label):
+    if label in ['4 stars', '5 stars']:
+        return 'positive'
+    elif label == '3 stars':
+        return 'neutral'
+    elif label.lower() in ['positive', 'neutral']:
+        return label.lower()
+    return 'negative'
+
+def _distilbert_window(sentiment_pipeline, chunk, batch_size, max_length):
+    order = np.argsort([len(text) for text in chunk], kind='stable')
+    scores = np.empty(len(chunk), dtype=np.float64)
+    sentiments = np.empty(len(chunk), dtype=object)
+    for batch_start in range(0, len(chunk), batch_size):
+        positions = order[batch_start:batch_start + batch_size]
+        results = sentiment_pipeline([chunk[i] for i in positions], batch_size=batch_size,
+                                     truncation=True, max_length=max_length)
+        for position, result in zip(positions, results):
+            scores[position] = result['score']
+            sentiments[position] = _distilbert_sentiment(result['label'])
+    return scores, sentiments
+
+_distilbert_window = instrumented(_distilbert_window, 'sentiment_batch.distilbert')
+
+# Rows with the same normalised text share one key; scoring the first row of each
+# key and indexing the results with codes gives every row its scores.
+def deduplicate(texts):
+    keys = [text_key(text) for text in texts]
+    codes, unique_keys = pd.factorize(pd.Series(keys, dtype=object))
+    first_rows = np.unique(codes, return_index=True)[1]
+    return codes, list(unique_keys), first_rows
+
+# The same for a TextColumn: keys are computed for each distinct value that
+# occurs in a row, decoding a chunk of values at a time. Returns key codes for
+# the column's non-missing rows, the keys, and the value code of one text per key.
+def deduplicate_column(column, chunk_size=100000):
+    row_codes = column.present_codes()
+    values = np.unique(row_codes)
+    keys = []
+    for start in range(0, len(values), chunk_size):
+        keys.extend(text_key(text) for text in column.decode(values[start:start + chunk_size]))
+    key_codes, unique_keys = pd.factorize(pd.Series(keys, dtype=object))
+    representatives = values[np.unique(key_codes, return_index=True)[1]]
+    return key_codes[np.searchsorted(values, row_codes)], list(unique_keys), representatives
+
+def expand(found, unique_keys, codes):
+    per_key = list(zip(*(found[key] for key in unique_keys)))
+    return tuple(np.asarray(column)[codes] for column in per_key)
+
+RESULT_COLUMNS = {
+    'vader': ['Score', 'Sentiment'],
+    'textblob': ['Polarity Score', 'Sentiment', 'Subjectivity'],
+    'distilbert': ['Score', 'Sentiment'],
+}
+
+# Result table for a TextColumn's non-missing rows; the Text column is categorical,
+# so it holds each distinct text once instead of a copy per row.
+def result_frame(engine, column, columns):
+    result_df = pd.DataFrame(dict(zip(RESULT_COLUMNS[engine], columns)), index=column.present_index())
+    result_df.insert(0, 'Text', column.to_categorical(dropna=True))
+    return result_df
+
+def is_text_column(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return pd.api.types.is_object_dtype(series.cat.categories) or pd.api.types.is_string_dtype(series.cat.categories)
+    return series.dtype == 'object' or pd.api.types.is_string_dtype(series)
+
+@instrument_class()
 class SentimentAnalysis:
-    def __init__(self, df):
+    def __init__(self, df, cache=None):
         self.df = df
-
-    def get_text_columns(self):
-        text_columns = []
-        for column in self.df.columns:
-            if self.df[column].dtype == 'object':
-                text_columns.append(column)
-
-        result_data = {
-            'Column Name': [],
-            'Average Entry Length': [],
-            'Unique Entries': []
+        self.cache = cache
+        self.engines = {
+            'vader': self.vader_sentiment_analysis,
+            'textblob': self.textblob_sentiment_analysis,
+            'distilbert': self.distilbert_sentiment_analysis,
         }
 
-        for col in text_columns:
-            avg_length = self.df[col].dropna().apply(len).mean()
-            unique_entries = self.df[col].nunique()
-            result_data['Column Name'].append(col)
-            result_data['Average Entry Length'].append(avg_length)
-            result_data['Unique Entries'].append(unique_entries)
-
-        return pd.DataFrame(result_data)
-
-    def vader_sentiment_analysis(self, data):
-        analyzer = SentimentIntensityAnalyzer()
-        scores = []
-        sentiments = []
-
-        for entry in data:
-            score = analyzer.polarity_scores(entry)['compound']
-            scores.append(score)
-            if score >= 0.05:
-                sentiments.append('positive')
-            elif score <= -0.05:
-                sentiments.append('negative')
-            else:
-                sentiments.append('neutral')
-
+    def get_text_columns(self):
+        text_columns = [column for column in self.df.columns if is_text_column(self.df[column])]
+        return pd.DataFrame({
+            'Column Name': text_columns,
+            'Average Entry Length': [self.df[col].str.len().mean() for col in text_columns],
+            'Unique Entries': [self.df[col].nunique() for col in text_columns],
+        })
+
+    def vader_sentiment_analysis(self, data, workers=1, chunk_size=10000):
+        scores = _score_chunks(_vader_scores, list(data), workers, chunk_size)
+        sentiments = np.select([scores >= 0.05, scores <= -0.05], ['positive', 'negative'], default='neutral')
         return scores, sentiments
 
-    def textblob_sentiment_analysis(self, data):
-        scores = []
-        sentiments = []
-        subjectivity = []
-
-        for entry in data:
-            blob = TextBlob(entry)
-            score = blob.sentiment.polarity
-            scores.append(score)
-            subjectivity.append(blob.sentiment.subjectivity)
-            if score > 0:
-                sentiments.append('positive')
-            elif score == 0:
-                sentiments.append('neutral')
-            else:
-                sentiments.append('negative')
-
-        return scores, sentiments, subjectivity
-
-    def distilbert_sentiment_analysis(self, data):
-        if pipeline is None:
-            raise ImportError("Transformers library is not installed.")
+    def textblob_sentiment_analysis(self, data, workers=1, chunk_size=10000):
+        scores = _score_chunks(_textblob_scores, list(data), workers, chunk_size)
+        polarity, subjectivity = scores[:, 0], scores[:, 1]
+        sentiments = np.select([polarity > 0, polarity == 0], ['positive', 'neutral'], default='negative')
+        return polarity, sentiments, subjectivity
 
-        sentiment_pipeline = pipeline('sentiment-analysis', model='nlptown/bert-base-multilingual-uncased-sentiment')
+    def distilbert_sentiment_analysis(self, data, batch_size=32, window=1024, max_length=512, model=None):
         scores = []
         sentiments = []
-
-        for entry in data:
-            result = sentiment_pipeline(entry)[0]
-            label = result['label']
-            score = result['score']
-            scores.append(score)
-            if label in ['4 stars', '5 stars']:
-                sentiments.append('positive')
-            elif label == '3 stars':
-                sentiments.append('neutral')
-            else:
-                sentiments.append('negative')
-
-        return scores, sentiments
+        for window_scores, window_sentiments in self.iter_distilbert_sentiment(data, batch_size, window, max_length, model):
+            scores.append(window_scores)
+            sentiments.append(window_sentiments)
+        if not scores:
+            return np.empty(0, dtype=np.float64), np.empty(0, dtype=object)
+        return np.concatenate(scores), np.concatenate(sentiments)
+
+    # Yields results window by window in input order. Within a window the texts are
+    # sorted by length so each batch pads to similar lengths.
+    def iter_distilbert_sentiment(self, data, batch_size=32, window=1024, max_length=512, model=None):
+        sentiment_pipeline = get_sentiment_pipeline(model)
+        texts = list(data)
+        window = max(window, batch_size)
+
+        for start in range(0, len(texts), window):
+            yield _distilbert_window(sentiment_pipeline, texts[start:start + window], batch_size, max_length)
+
+    # Scores each distinct (normalised) text once, serving earlier results from the
+    # on-disk cache when one is attached, and expands the results back to data's order.
+    # A TextColumn is scored without decoding its rows; the results then follow its
+    # non-missing rows (column.present_index()).
+    def analyze(self, engine, data, **kwargs):
+        if isinstance(data, TextColumn):
+            codes, unique_keys, representatives = deduplicate_column(data)
+
+            def texts_for(key_indices):
+                return data.decode(representatives[key_indices])
+        else:
+            texts = list(data)
+            if not texts:
+                return self.engines[engine](texts, **kwargs)
+            codes, unique_keys, first_rows = deduplicate(texts)
+
+            def texts_for(key_indices):
+                return [texts[first_rows[i]] for i in key_indices]
+        if len(codes) == 0:
+            return self.engines[engine]([], **kwargs)
+
+        version = engine_version(engine, kwargs.get('model'))
+        found = {}
+        if self.cache is not None:
+            found = self.cache.get_many(unique_keys, engine, version)
+            self.cache.duplicates += len(codes) - len(unique_keys)
+        missing = [i for i, key in enumerate(unique_keys) if key not in found]
+
+        if missing:
+            columns = self.engines[engine](texts_for(missing), **kwargs)
+            rows = list(zip(*(np.asarray(column).tolist() for column in columns)))
+            for i, row in zip(missing, rows):
+                found[unique_keys[i]] = list(row)
+            if self.cache is not None:
+                self.cache.put_many([(unique_keys[i], list(row)) for i, row in zip(missing, rows)], engine, version)
+
+        return expand(found, unique_keys, codes)
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import re
+import sqlite3
+import time
+import unicodedata
+
+_whitespace = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    return _whitespace.sub(' ', unicodedata.normalize('NFC', str(text))).strip()
+
+
+def text_key(text):
+    return hashlib.sha1(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+class SentimentCache:
+    def __init__(self, path='sentiment_cache.sqlite', max_entries=1000000, batch_size=500):
+        self.path = path
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self.duplicates = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            "key TEXT NOT NULL, engine TEXT NOT NULL, version TEXT NOT NULL, "
+            "result TEXT NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (key, engine, version))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS scores_last_used ON scores (last_used)")
+        self.conn.commit()
+
+    def get_many(self, keys, engine, version):
+        found = {}
+        now = time.time()
+        for start in range(0, len(keys), self.batch_size):
+            batch = keys[start:start + self.batch_size]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.conn.execute(
+                f"SELECT key, result FROM scores WHERE engine = ? AND version = ? AND key IN ({placeholders})",
+                [engine, version, *batch],
+            ).fetchall()
+            for key, result in rows:
+                found[key] = json.loads(result)
+            self.conn.execute(
+                f"UPDATE scores SET last_used = ? WHERE engine = ? AND version = ? AND key IN ({placeholders})",
+                [now, engine, version, *batch],
+            )
+        self.conn.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items, engine, version):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO scores (key, engine, version, result, last_used) VALUES (?, ?, ?, ?, ?)",
+            [(key, engine, version, json.dumps(result), now) for key, result in items],
+        )
+        self.evict()
+        self.conn.commit()
+
+    # Least-recently-used entries are dropped once the store exceeds max_entries.
+    def evict(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM scores WHERE rowid IN (SELECT rowid FROM scores ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def report(self):
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups) * 100 if lookups else 0.0
+        print(f"Sentiment cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), "
+              f"{self.duplicates} duplicate entries scored once, {len(self)} stored results.")
+
+    def close(self):
+        self.conn.close()
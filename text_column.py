@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+
+def _code_dtype(count):
+    for dtype in (np.int8, np.int16, np.int32):
+        if count < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class TextColumn:
+    # Dictionary-encoded text: each distinct value is stored once as UTF-8 in one
+    # byte buffer (value i is text[offsets[i]:offsets[i + 1]]) and each row holds
+    # a small integer code, -1 for missing. There is no Python string per row, and
+    # repeated texts cost one code each. Values are decoded only when asked for,
+    # so scorers see each distinct text once and nothing else is materialised.
+    def __init__(self, codes, offsets, text, index=None, name=None):
+        self.codes = codes
+        self.offsets = offsets
+        self.text = text
+        self.index = pd.RangeIndex(len(codes)) if index is None else index
+        self.name = name
+
+    @classmethod
+    def from_values(cls, values, index=None, name=None):
+        # Categorical columns are already dictionary-encoded, so only their
+        # categories are encoded and their codes are used as they are.
+        if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+            codes, uniques = np.asarray(values.cat.codes), values.cat.categories
+        else:
+            codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        encoded = [str(value).encode('utf-8') for value in uniques]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(value) for value in encoded])
+        text = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(codes.astype(_code_dtype(len(encoded)), copy=False), offsets, text, index, name)
+
+    @classmethod
+    def from_series(cls, series):
+        return cls.from_values(series, series.index, series.name)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def unique_count(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.offsets.nbytes + self.text.nbytes
+
+    def present(self):
+        return self.codes >= 0
+
+    def present_index(self):
+        return self.index[self.present()]
+
+    def present_codes(self):
+        return self.codes[self.present()]
+
+    def decode(self, value_codes):
+        # memoryview slices decode straight from the buffer without copying it.
+        view = memoryview(self.text)
+        offsets = self.offsets
+        return [str(view[offsets[i]:offsets[i + 1]], 'utf-8') for i in value_codes]
+
+    def uniques(self):
+        return self.decode(range(self.unique_count))
+
+    # One Python string per distinct value; rows share them through the codes.
+    def to_categorical(self, dropna=False):
+        codes = self.present_codes() if dropna else self.codes
+        return pd.Categorical.from_codes(codes, categories=pd.Index(self.uniques(), dtype=object), validate=False)
+
+    def to_series(self, dropna=False):
+        index = self.present_index() if dropna else self.index
+        return pd.Series(self.to_categorical(dropna), index=index, name=self.name, copy=False)
+
+    def to_numpy(self):
+        # The last slot stands in for missing values (code -1).
+        lookup = np.empty(self.unique_count + 1, dtype=object)
+        lookup[:-1] = self.uniques()
+        lookup[-1] = np.nan
+        return lookup[self.codes]
+
+
+def memory_report(series, column):
+    return {
+        'rows': len(column),
+        'distinct': column.unique_count,
+        'series_bytes': int(series.memory_usage(deep=True, index=False)),
+        'compact_bytes': int(column.nbytes),
+    }
+
+
+def print_memory_report(report):
+    saved = 1 - report['compact_bytes'] / report['series_bytes'] if report['series_bytes'] else 0.0
+    print(f"Text column memory: {report['series_bytes']:,} bytes as a Series, {report['compact_bytes']:,} bytes "
+          f"dictionary-encoded ({saved:.0%} less; {report['rows']:,} rows, {report['distinct']:,} distinct).")